@@ -0,0 +1,194 @@
+"""
+Benchmarks construction and rendering cost of the chunking scenes.
+
+    python bench.py                                  # default sweep
+    python bench.py --sizes 8 16 --layouts 1x2 2x2 --blocking 1 2 -o bench.json
+    python bench.py --no-render                      # scene logic only
+
+Every configuration runs Chunking5p in a fresh process and records, for the
+whole render and for each phase (grid construction, run_chunks,
+run_chunks_temporal_blocking, exchange_halos), the wall time, play() count
+and rendered video seconds, plus the peak mobject count and peak RSS.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from common import HERE, PHASE_CACHE_ENV, parse_layout
+
+
+class BenchmarkMixin:
+    """
+    Counts plays and mobjects and times the phase methods of a chunking scene
+    """
+
+    def setup(self):
+        super().setup()
+        self.play_count = 0
+        self.peak_mobjects = 0
+        self.phases = {}
+        grid_class = self.grid_class
+        self.grid_class = lambda *args, **kwargs: self._timed(
+            "grid_construction", grid_class, *args, **kwargs
+        )
+
+    def _timed(self, phase, fn, *args, **kwargs):
+        plays = self.play_count
+        rendered = self.renderer.time
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        stats = self.phases.setdefault(
+            phase, {"calls": 0, "wall_time": 0.0, "plays": 0, "rendered_time": 0.0}
+        )
+        stats["calls"] += 1
+        stats["wall_time"] += time.perf_counter() - start
+        stats["plays"] += self.play_count - plays
+        stats["rendered_time"] += self.renderer.time - rendered
+        return result
+
+    def play(self, *args, **kwargs):
+        super().play(*args, **kwargs)
+        self.play_count += 1
+        self.peak_mobjects = max(
+            self.peak_mobjects, len(self.get_mobject_family_members())
+        )
+
+    def run_chunks(self, *args, **kwargs):
+        phase = "run_chunks"
+        if self.temporal_blocking > 1:
+            phase = "run_chunks_temporal_blocking"
+        return self._timed(phase, super().run_chunks, *args, **kwargs)
+
+    def exchange_halos(self, *args, **kwargs):
+        return self._timed("exchange_halos", super().exchange_halos, *args, **kwargs)
+
+
+def run_benchmark(params):
+    os.chdir(HERE)
+    sys.path.insert(0, str(HERE))
+    with tempfile.TemporaryDirectory(prefix="xmk-bench-") as media_dir:
+        # Phases must render, not come from the phase cache
+        os.environ[PHASE_CACHE_ENV] = media_dir
+
+        import grid
+        import main as scenes
+        from manim import tempconfig
+
+        scene_class = type(
+            "Chunking5pBenchmark",
+            (BenchmarkMixin, scenes.Chunking5p),
+            {
+                "grid_size": params["grid_size"],
+                "layout": tuple(params["layout"]),
+                "temporal_blocking": params["temporal_blocking"],
+                "rounds": params["rounds"],
+                "grid_class": getattr(grid, params["grid_class"]),
+            },
+        )
+        overrides = {
+            "media_dir": media_dir,
+            "disable_caching": True,
+            "write_to_movie": params["encode"],
+            "verbosity": "WARNING",
+            "progress_bar": "none",
+        }
+        with tempconfig(overrides):
+            scene = scene_class(skip_animations=not params["render"])
+            start = time.perf_counter()
+            scene.render()
+            wall_time = time.perf_counter() - start
+
+    rendered_time = scene.renderer.time
+    return {
+        **params,
+        "wall_time": wall_time,
+        "plays": scene.play_count,
+        "peak_mobjects": scene.peak_mobjects,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rendered_time": rendered_time,
+        "rendered_seconds_per_wall_second": rendered_time / wall_time,
+        "phases": scene.phases,
+    }
+
+
+def sweep(sizes, layouts, blocking, **common):
+    for size, layout, depth in itertools.product(sizes, layouts, blocking):
+        # Every chunk needs owned cells wider than its halo
+        if size // max(layout) <= depth:
+            continue
+        yield {
+            "grid_size": size,
+            "layout": list(layout),
+            "temporal_blocking": depth,
+            **common,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument(
+        "--layouts", type=parse_layout, nargs="+", default=[(1, 2), (2, 2), (1, 4)]
+    )
+    parser.add_argument("--blocking", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument(
+        "--grid-class", default="Grid", choices=["Grid", "ArrayGrid", "lod_grid"]
+    )
+    parser.add_argument(
+        "--no-render", dest="render", action="store_false", help="skip frames"
+    )
+    parser.add_argument("--encode", action="store_true", help="also write movies")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="parallel runs, skews timings"
+    )
+    parser.add_argument("-o", "--output", type=Path)
+    args = parser.parse_args(argv)
+
+    configs = list(
+        sweep(
+            args.sizes,
+            args.layouts,
+            args.blocking,
+            rounds=args.rounds,
+            grid_class=args.grid_class,
+            render=args.render,
+            encode=args.encode,
+        )
+    )
+    # One process per run so peak RSS and caches belong to that run only
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as pool:
+        results = []
+        for result in pool.map(run_benchmark, configs):
+            results.append(result)
+            print(
+                f"size={result['grid_size']} layout={result['layout']} "
+                f"blocking={result['temporal_blocking']}: "
+                f"{result['wall_time']:.2f}s, {result['plays']} plays, "
+                f"{result['peak_mobjects']} mobjects, {result['peak_rss_mb']:.0f} MB",
+                file=sys.stderr,
+            )
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
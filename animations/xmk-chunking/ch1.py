@@ -1,23 +1,24 @@
-from manim import *
-
-
-class Chunking(Scene):
-    def create_grid(self, entries, cell_size):
-        n_rows = len(entries)
-        n_cols = len(entries[0])
-        grid = VGroup()
-        for i in range(n_rows):
-            row = VGroup()
-            for j in range(n_cols):
-                square = Square(side_length=cell_size, color=BLUE)
-                number = Text(entries[i][j]).scale(0.5)
-                number.move_to(square.get_center())
-                row.add(VGroup(square, number))
-            row.arrange(RIGHT, buff=0)
-            grid.add(row)
-        grid.arrange(DOWN, buff=0)
-        return grid
-
+from manim import (
+    BLUE,
+    LEFT,
+    RIGHT,
+    TEAL,
+    YELLOW,
+    Create,
+    FadeIn,
+    FadeOut,
+    Scene,
+    VGroup,
+    Write,
+)
+
+from glyphs import ValueFade
+from grid import Grid, create_gpu_rect
+from sections import RenderProfileMixin
+from stencil import FIVE_POINT
+
+
+class Chunking(RenderProfileMixin, Scene):
     def split_grid_into_chunks(self, grid, mid_col, halo_width):
         left_half = VGroup(
             *[
@@ -56,44 +57,14 @@ class Chunking(Scene):
 
         return left_half, right_half
 
-    def create_gpu_rect(self, entries, cell_size, halo_width):
-        n_cols = len(entries[0])
-        mid_col = n_cols // 2 + n_cols % 2
-
-        padding_x = 0.1
-        padding_y = 0.08
-        gpu_rect = Rectangle(
-            width=(1 + padding_x) * cell_size * (mid_col + halo_width),
-            height=(1 + padding_y) * cell_size * len(entries),
-        )
-        gpu_rect.to_edge(RIGHT, buff=2)
-
-        # GPU label
-        gpu_label = Text("GPU", font_size=36)
-        gpu_label.next_to(gpu_rect, UP, buff=0.2)  # position above the rectangle
-        self.play(Create(gpu_rect), Write(gpu_label))
-
-        return gpu_rect
-
     def update_cell_with_neighbors(
         self, grid, i, j, new_value, duration=0.2, highlight_opacity=0.8
     ):
         """
         Updates grid[i][j] with new_value and temporarily increases the opacity of its neighbors
         """
-        n_rows = len(grid)
-        n_cols = len(grid[0])
-        neighbors = []
-
-        # Collect neighboring cells (up, down, left, right)
-        if i > 0:
-            neighbors.append(grid[i - 1][j])
-        if i < n_rows - 1:
-            neighbors.append(grid[i + 1][j])
-        if j > 0:
-            neighbors.append(grid[i][j - 1])
-        if j < n_cols - 1:
-            neighbors.append(grid[i][j + 1])
+        rows, cols = FIVE_POINT.neighbors(i, j, (len(grid), len(grid[0])))
+        neighbors = [grid[row][col] for row, col in zip(rows, cols)]
 
         # Animate neighbor highlight
         highlight_anims = [
@@ -104,10 +75,7 @@ class Chunking(Scene):
 
         # Update the center cell
         square, number = grid[i][j]
-        self.play(
-            Transform(number, Text(new_value).scale(0.5).move_to(square.get_center())),
-            run_time=duration,
-        )
+        self.play(ValueFade(number, new_value), run_time=duration)
 
         # Restore neighbor opacity
         restore_anims = [
@@ -135,7 +103,7 @@ class Chunking(Scene):
                         or (j == len(chunk[0]) - 1)
                     ):
                         square, number = cell
-                        new_value = str(int(number.text) + 1)
+                        new_value = int(number.get_value()) + 1
                         self.update_cell_with_neighbors(
                             chunk, i, j, new_value, duration=0.2, highlight_opacity=0.2
                         )
@@ -147,7 +115,7 @@ class Chunking(Scene):
                         or (i == (len(chunk) - 1))
                     ):
                         square, number = cell
-                        new_value = str(int(number.text) + 1)
+                        new_value = int(number.get_value()) + 1
                         self.update_cell_with_neighbors(
                             chunk, i, j, new_value, duration=0.2, highlight_opacity=0.2
                         )
@@ -169,14 +137,8 @@ class Chunking(Scene):
 
         n_rows = len(chunk0)
         for i in range(n_rows):
-            square, number = chunk0[i, -1]
-            new_value = str(500)
-            self.play(
-                Transform(
-                    number, Text(new_value).scale(0.5).move_to(square.get_center())
-                ),
-                run_time=0.2,
-            )
+            square, number = chunk0[i][-1]
+            self.play(ValueFade(number, 500), run_time=0.2)
 
         # Move chunk1 back to original position
         self.play(chunk1.animate.move_to(chunk1_pos))
@@ -195,12 +157,15 @@ class Chunking(Scene):
         n_cols = len(entries[0])
         mid_col = n_cols // 2 + n_cols % 2
 
-        grid = self.create_grid(entries, cell_size)
+        grid = Grid(entries, cell_size, None, 0).get_vgroup()
         grid.to_edge(LEFT)
         self.play(FadeIn(grid))
 
-        # GPU rectangle
-        gpu_rect = self.create_gpu_rect(entries, cell_size, halo_width)
+        # GPU rectangle, as wide as a half with its halo
+        gpu_rect, gpu_label = create_gpu_rect(
+            (len(entries), mid_col + halo_width), cell_size
+        )
+        self.play(Create(gpu_rect), Write(gpu_label))
 
         # Create **left and right halves with halo copies**
         left_half, right_half = self.split_grid_into_chunks(grid, mid_col, halo_width)
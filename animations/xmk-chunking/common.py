@@ -0,0 +1,83 @@
+"""
+Names and helpers shared by the scenes and the command line tools. Nothing
+here imports manim, so render.py, sweep.py and the others start quickly.
+"""
+
+import functools
+import hashlib
+import os
+from pathlib import Path
+
+from spec import read_specs
+
+HERE = Path(__file__).resolve().parent
+
+# "k/n": a worker only renders sections whose index is k modulo n, see render.py
+SECTIONS_ENV = "XMK_RENDER_SECTIONS"
+# Render SectionedScenes in a single encoder pass, see stream.py
+STREAM_ENV = "XMK_STREAM"
+# Name of a render profile, see profiles.py
+PROFILE_ENV = "XMK_RENDER_PROFILE"
+# Directory of the phase cache, see sections.py
+PHASE_CACHE_ENV = "XMK_PHASE_CACHE"
+# Profiler export whose durations replace the scenes' run times, see timings.py
+TIMINGS_ENV = "XMK_TIMINGS"
+# Where profiling.py writes its Chrome trace
+TRACE_ENV = "XMK_PROFILE"
+# Directory of text SVGs the scene processes of render.py, sweep.py and
+# golden.py share, see glyphs.warm_text_cache
+TEXT_STORE_ENV = "XMK_TEXT_STORE"
+# Processes a scene shapes its text with
+TEXT_JOBS_ENV = "XMK_TEXT_JOBS"
+
+TEXT_STORE = HERE / "media" / "text_store"
+
+# (file, scene, split into sections); main.py has one scene per spec table
+SCENES = [("main.py", name, True) for name in read_specs()] + [
+    ("ch1.py", "Chunking", False),
+    ("simple.py", "Chunking", False),
+]
+
+
+def select_scenes(names, scenes=SCENES):
+    """
+    Entries of scenes for names given as file.py or file.py:Scene, all of
+    them when there are no names
+    """
+    if not names:
+        return scenes
+    selected = []
+    for name in names:
+        file, _, scene = name.partition(":")
+        matches = [s for s in scenes if s[0] == file and (not scene or s[1] == scene)]
+        if not matches:
+            raise SystemExit(f"Unknown scene {name}")
+        selected.extend(matches)
+    return selected
+
+
+def text_jobs(scene_processes):
+    """
+    XMK_TEXT_JOBS for scene_processes scenes rendered at once
+    """
+    return str(max(1, os.cpu_count() // scene_processes))
+
+
+def parse_layout(value):
+    """
+    "2x4" as (row chunks, column chunks)
+    """
+    rows, _, cols = value.partition("x")
+    return int(rows), int(cols)
+
+
+@functools.cache
+def hash_sources(directory=HERE):
+    """
+    Hash of the Python files in directory, read once per process
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(directory).glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
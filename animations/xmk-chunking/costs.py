@@ -0,0 +1,202 @@
+"""
+Analytical cost model for chunked stencil runs with temporal blocking.
+
+    python costs.py --size 1024 --layout 2x2 --stencil 5-point --max-depth 8
+    python costs.py --size 4096 --bandwidth 25e9 --flop-rate 20e12 --overlap
+
+Deeper blocking transfers each chunk once per `depth` steps instead of once
+per step, but needs a halo that is (depth - 1) * radius cells wider and
+recomputes those halo cells redundantly. For every depth the model counts
+the bytes moved, halo copies and redundant FLOPs of one round on the real
+decomposition and turns them into an estimated time per step.
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+from common import parse_layout
+from stencil import STENCILS, decompose
+
+
+@dataclass
+class ChunkCost:
+    chunk: int
+    # Upload plus download of the cells the chunk holds
+    transfer_bytes: int
+    flops: float
+    redundant_flops: float
+
+
+@dataclass
+class Estimate:
+    """
+    Costs of one round, which advances depth steps
+    """
+
+    depth: int
+    halo: int
+    chunks: list
+    transfer_bytes: int
+    halo_bytes: int
+    flops: float
+    redundant_flops: float
+    transfer_time: float
+    compute_time: float
+    time_per_step: float
+
+
+def format_si(value, unit):
+    if value == 0:
+        return f"0 {unit}"
+    exponent = int(np.clip(np.floor(np.log10(abs(value)) / 3), -3, 4))
+    prefix = ("n", "µ", "m", "", "k", "M", "G", "T")[exponent + 3]
+    return f"{value / 1000**exponent:.3g} {prefix}{unit}"
+
+
+def _interior(lo, hi, n, radius):
+    # Cells of [lo, hi) that are not part of the fixed boundary
+    return max(0, min(hi, n - radius) - max(lo, radius))
+
+
+@dataclass
+class CostModel:
+    shape: tuple
+    layout: tuple = (1, 2)
+    halo_width: int = 1
+    radius: int = 1
+    stencil_points: int = 5
+    # Host <-> device bytes per second and device FLOPs per second
+    bandwidth: float = 16e9
+    flop_rate: float = 1e12
+    bytes_per_cell: int = 8
+    # Pipelined runs hide transfers behind compute
+    overlap: bool = False
+
+    @classmethod
+    def for_stencil(cls, shape, stencil, **kwargs):
+        return cls(
+            tuple(shape), radius=stencil.radius, stencil_points=len(stencil), **kwargs
+        )
+
+    @property
+    def flops_per_cell(self):
+        # One multiply-add per stencil point
+        return 2 * self.stencil_points
+
+    def halo(self, depth):
+        return self.halo_width + (depth - 1) * self.radius
+
+    def _chunk_cost(self, chunk, depth):
+        n_rows, n_cols = self.shape
+        r = self.radius
+        held = chunk.shape[0] * chunk.shape[1]
+        owned = _interior(
+            chunk.owned_start[0], chunk.owned_stop[0], n_rows, r
+        ) * _interior(chunk.owned_start[1], chunk.owned_stop[1], n_cols, r)
+        computed = 0
+        for t in range(depth):
+            # Step t also updates the halo cells later steps of the round read
+            extent = (depth - 1 - t) * r
+            rows = _interior(
+                chunk.owned_start[0] - extent, chunk.owned_stop[0] + extent, n_rows, r
+            )
+            cols = _interior(
+                chunk.owned_start[1] - extent, chunk.owned_stop[1] + extent, n_cols, r
+            )
+            computed += rows * cols
+        return ChunkCost(
+            chunk.index,
+            2 * held * self.bytes_per_cell,
+            computed * self.flops_per_cell,
+            (computed - depth * owned) * self.flops_per_cell,
+        )
+
+    def _halo_bytes(self, chunks):
+        cells = 0
+        for dst in chunks:
+            for src in chunks:
+                if src is dst:
+                    continue
+                lo = np.maximum(src.owned_start, dst.start)
+                hi = np.minimum(src.owned_stop, dst.stop)
+                cells += int(np.prod(np.maximum(hi - lo, 0)))
+        return cells * self.bytes_per_cell
+
+    def estimate(self, depth) -> Estimate:
+        halo = self.halo(depth)
+        chunks = decompose(self.shape, self.layout, halo)
+        costs = [self._chunk_cost(chunk, depth) for chunk in chunks]
+        transfer_bytes = sum(c.transfer_bytes for c in costs)
+        halo_bytes = self._halo_bytes(chunks)
+        flops = sum(c.flops for c in costs)
+        transfer_time = (transfer_bytes + halo_bytes) / self.bandwidth
+        compute_time = flops / self.flop_rate
+        if self.overlap:
+            round_time = max(transfer_time, compute_time)
+        else:
+            round_time = transfer_time + compute_time
+        return Estimate(
+            depth,
+            halo,
+            costs,
+            transfer_bytes,
+            halo_bytes,
+            flops,
+            sum(c.redundant_flops for c in costs),
+            transfer_time,
+            compute_time,
+            round_time / depth,
+        )
+
+    def sweep(self, max_depth=16):
+        # A halo wider than a neighbour's owned cells is filled from the chunks
+        # beyond it, like StencilEngine.exchange_halos does, so every depth runs
+        return [self.estimate(depth) for depth in range(1, max_depth + 1)]
+
+    def optimal_depth(self, max_depth=16) -> Estimate:
+        """
+        Blocking depth with the lowest estimated time per step
+        """
+        return min(self.sweep(max_depth), key=lambda e: e.time_per_step)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--layout", type=parse_layout, default=(1, 2))
+    parser.add_argument("--stencil", choices=list(STENCILS), default="5-point")
+    parser.add_argument("--halo-width", type=int)
+    parser.add_argument("--bandwidth", type=float, default=16e9, help="bytes/s")
+    parser.add_argument("--flop-rate", type=float, default=1e12, help="FLOP/s")
+    parser.add_argument("--bytes-per-cell", type=int, default=8)
+    parser.add_argument("--overlap", action="store_true", help="pipelined transfers")
+    parser.add_argument("--max-depth", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    stencil = STENCILS[args.stencil]
+    model = CostModel.for_stencil(
+        (args.size, args.size),
+        stencil,
+        layout=args.layout,
+        halo_width=args.halo_width or stencil.radius,
+        bandwidth=args.bandwidth,
+        flop_rate=args.flop_rate,
+        bytes_per_cell=args.bytes_per_cell,
+        overlap=args.overlap,
+    )
+    best = model.optimal_depth(args.max_depth)
+    print(f"{'depth':>5} {'halo':>5} {'moved':>10} {'redundant':>12} {'per step':>10}")
+    for e in model.sweep(args.max_depth):
+        print(
+            f"{e.depth:>5} {e.halo:>5} "
+            f"{format_si(e.transfer_bytes + e.halo_bytes, 'B'):>10} "
+            f"{format_si(e.redundant_flops, 'FLOP'):>12} "
+            f"{format_si(e.time_per_step, 's'):>10}"
+            + ("  <- best" if e.depth == best.depth else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
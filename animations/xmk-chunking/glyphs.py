@@ -0,0 +1,214 @@
+import multiprocessing
+import os
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from manim import (
+    DEFAULT_FONT_SIZE,
+    ORIGIN,
+    WHITE,
+    Animation,
+    Text,
+    VGroup,
+    config,
+)
+
+from common import TEXT_JOBS_ENV, TEXT_STORE_ENV
+
+
+class GlyphCache:
+    """
+    Bounded LRU cache of pre-built number mobjects.
+    Building a Text means a Pango layout plus an SVG parse, so every distinct
+    (value, scale, font, color) is built once and handed out as a copy.
+    Glyphs are shaped at font_size and scaled to look as if they were shaped
+    at the default size.
+    """
+
+    def __init__(self, max_size=512, font_size=DEFAULT_FONT_SIZE):
+        self.max_size = max_size
+        self.font_size = font_size
+        self._glyphs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, value, scale, font, color):
+        return (str(value), float(scale), font, str(color))
+
+    def text_kwargs(self, font="", color=WHITE):
+        return dict(font=font, color=color, font_size=self.font_size)
+
+    def set_font_size(self, font_size):
+        if font_size != self.font_size:
+            self.font_size = font_size
+            self.clear()
+
+    def get(self, value, scale=0.5, font="", color=WHITE) -> Text:
+        key = self._key(value, scale, font, color)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            self.misses += 1
+            glyph = Text(str(value), **self.text_kwargs(font, color))
+            glyph.scale(scale * DEFAULT_FONT_SIZE / self.font_size)
+            self._glyphs[key] = glyph
+            if len(self._glyphs) > self.max_size:
+                self._glyphs.popitem(last=False)
+        else:
+            self.hits += 1
+            self._glyphs.move_to_end(key)
+        return glyph.copy()
+
+    def __len__(self):
+        return len(self._glyphs)
+
+    def clear(self):
+        self._glyphs.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+glyph_cache = GlyphCache()
+
+
+def number_glyph(value, scale=0.5, font="", color=WHITE) -> Text:
+    return glyph_cache.get(value, scale=scale, font=font, color=color)
+
+
+# Text store of the render profile, which wins over XMK_TEXT_STORE
+_text_store = None
+
+
+def set_text_store(directory):
+    global _text_store
+    _text_store = directory
+
+
+def get_text_store():
+    store = _text_store or os.environ.get(TEXT_STORE_ENV)
+    return Path(store) if store else None
+
+
+def _copy_texts(source, target):
+    # Copied under a name of its own and renamed, so a process reading target
+    # never sees half an SVG
+    target.mkdir(parents=True, exist_ok=True)
+    for svg in source.glob("*.svg"):
+        if not (target / svg.name).exists():
+            partial = target / f".{svg.name}.{os.getpid()}"
+            shutil.copyfile(svg, partial)
+            os.replace(partial, target / svg.name)
+
+
+def _shape_text(text):
+    string, kwargs = text
+    Text(string, **dict(kwargs))
+
+
+def warm_text_cache(texts, jobs=None):
+    """
+    Shapes texts, (string, Text keyword arguments) pairs, in a process pool so
+    their SVGs are in manim's text directory before the scene asks for them.
+    Workers are forked and share the scene's config, text directory included.
+    jobs defaults to XMK_TEXT_JOBS, which render.py, sweep.py and golden.py
+    set so their scene processes and these pools together use each core once,
+    or else to every core.
+
+    manim rewrites a text's SVG whenever it builds the Text, so processes can
+    not share a text directory. They share a text store instead: its SVGs are
+    copied into the text directory before shaping and the new ones back after.
+    """
+    texts = list(dict.fromkeys((s, tuple(sorted(kw.items()))) for s, kw in texts))
+    text_dir = config.get_dir("text_dir")
+    store = get_text_store()
+    if store is not None and store.is_dir():
+        _copy_texts(store, text_dir)
+    if jobs is None:
+        jobs = int(os.environ.get(TEXT_JOBS_ENV) or os.cpu_count())
+    if jobs == 1 or len(texts) < 2:
+        for text in texts:
+            _shape_text(text)
+    else:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+            list(pool.map(_shape_text, texts, chunksize=8))
+    if store is not None:
+        _copy_texts(text_dir, store)
+
+
+def warm_glyphs(values, scale=0.5, font="", color=WHITE, jobs=None):
+    """
+    Shapes the glyphs of values in parallel, then fills glyph_cache with them
+    """
+    values = list(dict.fromkeys(str(value) for value in values))
+    kwargs = glyph_cache.text_kwargs(font, color)
+    warm_text_cache([(value, kwargs) for value in values], jobs)
+    for value in values[-glyph_cache.max_size :]:
+        glyph_cache.get(value, scale=scale, font=font, color=color)
+
+
+class NumberCell(VGroup):
+    """
+    A cell's number. The value is kept as is, so it never has to be parsed back
+    out of a Text, and is shown as a cached glyph that is swapped in place,
+    centred or lined up with the old glyph's aligned_edge.
+    """
+
+    def __init__(self, value, scale=0.5, font="", color=WHITE, aligned_edge=ORIGIN):
+        super().__init__()
+        self.value = value
+        self.aligned_edge = aligned_edge
+        self.glyph_style = dict(scale=scale, font=font, color=color)
+        self.glyph = number_glyph(value, **self.glyph_style)
+        self.add(self.glyph)
+
+    def get_value(self):
+        return self.value
+
+    def get_glyph(self, value) -> Text:
+        glyph = number_glyph(value, **self.glyph_style)
+        return glyph.move_to(self.glyph, aligned_edge=self.aligned_edge)
+
+    def set_value(self, value):
+        glyph = self.get_glyph(value)
+        self.remove(self.glyph)
+        self.add(glyph)
+        self.value = value
+        self.glyph = glyph
+        return self
+
+
+class ValueFade(Animation):
+    """
+    Changes a NumberCell's value with a cross-fade between the old and new glyph.
+    The value changes right away, only the glyph waits for the animation.
+    """
+
+    def __init__(self, cell: NumberCell, value, **kwargs):
+        super().__init__(cell, **kwargs)
+        cell.value = value
+        self.new_glyph = cell.get_glyph(value)
+
+    def create_starting_mobject(self):
+        # Only the two glyphs' opacities change, nothing to interpolate from
+        return self.mobject
+
+    def begin(self):
+        cell = self.mobject
+        self.old_glyph = cell.glyph
+        self.opacity = self.old_glyph.get_fill_opacity()
+        self.new_glyph.move_to(self.old_glyph, aligned_edge=cell.aligned_edge)
+        cell.add(self.new_glyph)
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alpha = self.rate_func(alpha)
+        self.old_glyph.set_fill(opacity=self.opacity * (1 - alpha))
+        self.new_glyph.set_fill(opacity=self.opacity * alpha)
+
+    def finish(self):
+        super().finish()
+        cell = self.mobject
+        cell.remove(self.old_glyph)
+        cell.glyph = self.new_glyph
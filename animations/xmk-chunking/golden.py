@@ -0,0 +1,309 @@
+"""
+Checks that the chunking scenes still look the way they did.
+
+    python golden.py                      # every scene against golden.json
+    python golden.py main.py:Chunking5p -j 2
+    python golden.py --update             # record after an intended change
+    python golden.py --update --rev f159bc7   # record from a baseline commit
+
+Every scene runs with its animations skipped at a low resolution, and the
+frame is captured wherever a phase ends: before every next_section, after
+every wait() and when construct returns. Frames are named after their
+section and the number of frames of that section before them, as in
+"exchange_halos#2", and the last frame is "end", so a revision that plays
+a scene in fewer animations or other sections is compared at the frames
+both have. Each frame is stored as a difference hash that changes with a
+moved chunk, a highlighted cell or a different digit. Renders on one
+machine hash the same; goldens taken elsewhere may need a --tolerance of a
+few bits for antialiasing. The final values of the scene's Grid and of
+every number shown must match exactly.
+
+With --rev the scenes come from that git revision, checked out in a
+temporary worktree, so goldens recorded with --update --rev are the
+baseline's frames that the current tree is compared against.
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from common import (
+    HERE,
+    PROFILE_ENV,
+    SECTIONS_ENV,
+    STREAM_ENV,
+    TEXT_JOBS_ENV,
+    TEXT_STORE,
+    TEXT_STORE_ENV,
+    select_scenes,
+    text_jobs,
+)
+
+GOLDEN_FILE = HERE / "golden.json"
+PIXEL_WIDTH = 320
+PIXEL_HEIGHT = 180
+HASH_SIZE = 32
+
+
+def frame_hash(frame, hash_size=HASH_SIZE):
+    """
+    Difference hash of an RGBA frame, as hex: whether each of hash_size x
+    hash_size cells is brighter than its right and its lower neighbour, per
+    color channel so that fills which only change hue count as well
+    """
+    rgb = frame[..., :3].astype(float)
+    # Area averages over a (hash_size + 1) square of cells
+    rows = np.linspace(0, rgb.shape[0], hash_size + 2).astype(int)[:-1]
+    cols = np.linspace(0, rgb.shape[1], hash_size + 2).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(rgb, rows, axis=0), cols, axis=1)
+    counts = np.outer(
+        np.diff(rows, append=rgb.shape[0]), np.diff(cols, append=rgb.shape[1])
+    )
+    small = sums / counts[..., None]
+    bits = [
+        small[:-1, 1:] > small[:-1, :-1],
+        small[1:, :-1] > small[:-1, :-1],
+    ]
+    return np.packbits(np.concatenate([b.ravel() for b in bits])).tobytes().hex()
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+class GoldenMixin:
+    """
+    Records a hash of the frame at every phase boundary of a scene, see the
+    module docstring
+    """
+
+    def setup(self):
+        self.golden_frames = []
+        self._captured_plays = 0
+        self._section_frames = Counter()
+        super().setup()
+
+    def capture(self):
+        plays = self.renderer.num_plays
+        # Nothing was played since the last capture, or at all
+        if plays == self._captured_plays:
+            return
+        self._captured_plays = plays
+        self.renderer.update_frame(self)
+        section = self.renderer.file_writer.sections[-1].name
+        label = f"{section}#{self._section_frames[section]}"
+        self._section_frames[section] += 1
+        self.golden_frames.append([label, frame_hash(self.renderer.get_frame())])
+
+    def next_section(self, *args, **kwargs):
+        self.capture()
+        super().next_section(*args, **kwargs)
+
+    def wait(self, *args, **kwargs):
+        super().wait(*args, **kwargs)
+        self.capture()
+
+    def tear_down(self):
+        self.capture()
+        # Whichever section a scene ends in, its last frame is the end
+        if self.golden_frames:
+            self.golden_frames[-1][0] = "end"
+        super().tear_down()
+
+
+def run_scene(job):
+    file, name, directory, jobs = job
+    os.chdir(directory)
+    if directory != HERE:
+        # Scenes of another revision import their own helpers, not ours
+        for module_name, module in list(sys.modules.items()):
+            path = Path(getattr(module, "__file__", None) or "/").resolve()
+            if path.parent == HERE and path.name != Path(__file__).name:
+                del sys.modules[module_name]
+    sys.path.insert(0, str(directory))
+    # Goldens are taken with the scene's own settings only
+    for env in (PROFILE_ENV, STREAM_ENV, SECTIONS_ENV):
+        os.environ.pop(env, None)
+    os.environ[TEXT_STORE_ENV] = str(TEXT_STORE)
+    os.environ[TEXT_JOBS_ENV] = jobs
+
+    import manim
+    from manim import tempconfig
+
+    module = importlib.import_module(Path(file).stem)
+    scene_class = type(name, (GoldenMixin, getattr(module, name)), {})
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="xmk-golden-") as media_dir:
+        overrides = {
+            "media_dir": media_dir,
+            "pixel_width": PIXEL_WIDTH,
+            "pixel_height": PIXEL_HEIGHT,
+            "write_to_movie": False,
+            "save_last_frame": False,
+            "disable_caching": True,
+            "verbosity": "WARNING",
+            "progress_bar": "none",
+        }
+        with tempconfig(overrides):
+            scene = scene_class(skip_animations=True)
+            scene.render()
+
+    grid = getattr(scene, "grid", None)
+    return {
+        "config": {
+            "manim": manim.__version__,
+            "pixel_width": PIXEL_WIDTH,
+            "pixel_height": PIXEL_HEIGHT,
+            "hash_size": HASH_SIZE,
+        },
+        "frames": scene.golden_frames,
+        "entries": None if grid is None else np.asarray(grid.get_entries()).tolist(),
+        # Any number shown, whichever class a revision draws it with. Scenes
+        # that only show Text have none, like those without a scene.grid
+        "values": [
+            str(mobject.get_value())
+            for mobject in scene.get_mobject_family_members()
+            # On the class, Mobject makes up a get_value for any attribute name
+            if callable(getattr(type(mobject), "get_value", None))
+        ]
+        or None,
+        "wall_time": time.perf_counter() - start,
+    }
+
+
+def compare(golden, result, tolerance):
+    """
+    Differences between a golden and a fresh result, as messages
+    """
+    problems = []
+    if golden["config"] != result["config"]:
+        problems.append(f"taken with {golden['config']}, now {result['config']}")
+    frames = dict(result["frames"])
+    for label, expected in golden["frames"]:
+        actual = frames.get(label)
+        if actual is None:
+            problems.append(f"no frame for {label}")
+            continue
+        distance = hamming(expected, actual)
+        if distance > tolerance:
+            problems.append(f"frame {label} differs by {distance} bits")
+    for key in ("entries", "values"):
+        expected, actual = golden[key], result[key]
+        # Goldens of a baseline that did not expose them only check frames
+        if expected is None or expected == actual:
+            continue
+        if actual is None or len(expected) != len(actual):
+            problems.append(f"{key} changed shape")
+            continue
+        index = next(i for i, (a, b) in enumerate(zip(expected, actual)) if a != b)
+        problems.append(f"{key}[{index}] is {actual[index]}, was {expected[index]}")
+    return problems
+
+
+def parse_scenes(names):
+    return [(file, scene) for file, scene, _ in select_scenes(names)]
+
+
+def checkout(rev, directory):
+    """
+    Adds a worktree of rev in directory and returns where this directory
+    is in it
+    """
+    top = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    subprocess.run(
+        ["git", "worktree", "add", "--detach", "--quiet", directory, rev],
+        cwd=HERE,
+        check=True,
+    )
+    return Path(directory) / HERE.relative_to(Path(top).resolve())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenes", nargs="*", help="file.py or file.py:Scene")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--golden", type=Path, default=GOLDEN_FILE)
+    parser.add_argument(
+        "--tolerance", type=int, default=0, help="bits a frame hash may differ by"
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="store the results as the goldens"
+    )
+    parser.add_argument("--rev", help="render the scenes of this git revision")
+    args = parser.parse_args(argv)
+
+    scenes = parse_scenes(args.scenes)
+    goldens = json.loads(args.golden.read_text()) if args.golden.exists() else {}
+    with tempfile.TemporaryDirectory(prefix="xmk-golden-rev-") as worktree:
+        directory = HERE if args.rev is None else checkout(args.rev, worktree)
+        jobs = [
+            (file, scene, directory, text_jobs(min(args.jobs, len(scenes))))
+            for file, scene in scenes
+        ]
+        try:
+            # manim's config is global, so every scene gets a fresh process
+            with ProcessPoolExecutor(
+                max_workers=args.jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=1,
+            ) as pool:
+                futures = [pool.submit(run_scene, job) for job in jobs]
+                results = {}
+                for scene, future in zip(scenes, futures):
+                    # A scene that does not render fails alone, a baseline
+                    # revision may have scenes that never did
+                    try:
+                        results[scene] = future.result()
+                    except Exception as e:
+                        results[scene] = e
+        finally:
+            if args.rev is not None:
+                subprocess.run(
+                    ["git", "worktree", "remove", "--force", worktree], cwd=HERE
+                )
+
+    failed = False
+    for (file, scene), result in results.items():
+        key = f"{file}:{scene}"
+        if isinstance(result, Exception):
+            failed = True
+            print(f"{key}: FAIL, {type(result).__name__}: {result}")
+            continue
+        summary = f"{len(result['frames'])} frames, {result.pop('wall_time'):.1f}s"
+        if args.update:
+            goldens[key] = result
+            print(f"{key}: recorded {summary}")
+            continue
+        if key not in goldens:
+            problems = [f"no golden in {args.golden.name}, record one with --update"]
+        else:
+            problems = compare(goldens[key], result, args.tolerance)
+        failed = failed or bool(problems)
+        print(f"{key}: {'FAIL' if problems else 'ok'} ({summary})")
+        for problem in problems:
+            print(f"    {problem}")
+
+    if args.update:
+        args.golden.write_text(json.dumps(goldens, indent=1) + "\n")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
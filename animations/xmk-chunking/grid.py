@@ -0,0 +1,705 @@
+import numpy as np
+from manim import (
+    BLUE,
+    BLUE_E,
+    DOWN,
+    RESAMPLING_ALGORITHMS,
+    RIGHT,
+    TEAL,
+    UL,
+    UP,
+    YELLOW,
+    Animation,
+    AnimationGroup,
+    FadeIn,
+    Group,
+    ImageMobject,
+    Rectangle,
+    Square,
+    Text,
+    VGroup,
+    VMobject,
+    Wait,
+    interpolate_color,
+)
+
+from glyphs import NumberCell, ValueFade
+from stencil import FIVE_POINT
+
+
+class SetFill(Animation):
+    """
+    Fades a mobject's fill to color and opacity. Unlike mobject.animate.set_fill
+    it copies nothing and starts from wherever the mobject is when it begins,
+    so it can be scheduled before earlier animations move the mobject.
+    """
+
+    def __init__(self, mobject, color, opacity, **kwargs):
+        super().__init__(mobject, **kwargs)
+        self.color = color
+        self.opacity = opacity
+
+    def create_starting_mobject(self):
+        return self.mobject
+
+    def begin(self):
+        self.start_color = self.mobject.get_fill_color()
+        self.start_opacity = self.mobject.get_fill_opacity()
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alpha = self.rate_func(alpha)
+        color = self.start_color
+        if self.color is not None:
+            color = interpolate_color(self.start_color, self.color, alpha)
+        opacity = self.start_opacity + (self.opacity - self.start_opacity) * alpha
+        self.mobject.set_fill(color, opacity)
+
+
+class Grid:
+
+    def __init__(self, entries, cell_size, fill, opacity):
+        self._entries = np.array(entries)
+        self.cell_size = cell_size
+        self._grid_vgroup = self._create_grid_vgroup(entries, cell_size, fill, opacity)
+        self.fill = fill
+        self.opacity = opacity
+        # Cells whose fill differs from (fill, opacity) until they are reset
+        self._dirty = set()
+
+    def _create_grid_vgroup(self, entries, cell_size, fill=None, fill_opacity=1):
+        n_rows = len(entries)
+        n_cols = len(entries[0])
+        grid = VGroup()
+        for i in range(n_rows):
+            row = VGroup()
+            for j in range(n_cols):
+                square = Square(side_length=cell_size, color=BLUE)
+                square.set_fill(fill, opacity=fill_opacity)
+                number = NumberCell(entries[i][j])
+                number.move_to(square.get_center())
+                row.add(VGroup(square, number))
+            row.arrange(RIGHT, buff=0)
+            grid.add(row)
+        grid.arrange(DOWN, buff=0)
+        return grid
+
+    def get_vgroup(self) -> VGroup:
+        return self._grid_vgroup
+
+    def get_entries(self):
+        return self._entries
+
+    def view(self, chunk, fill, opacity) -> "Grid":
+        """
+        Grid over the cells of a stencil.Chunk, sharing this grid's entries and
+        cell mobjects (see ChunkView)
+        """
+        return ChunkView(self, chunk, fill, opacity)
+
+    def _place_view(self, view, chunk):
+        # Put a grid built for chunk over the cells it holds
+        offset = chunk.start[1] * RIGHT + chunk.start[0] * DOWN
+        view.get_vgroup().move_to(
+            self.get_vgroup().get_corner(UL) + self.cell_size * offset,
+            aligned_edge=UL,
+        )
+        return view
+
+    def animate_show(self):
+        return [FadeIn(self.get_vgroup())]
+
+    def get_state(self):
+        """
+        What the grid shows as plain data: entries, every cell's value and fill,
+        and where the grid is (see set_state)
+        """
+        cells = [
+            [
+                [
+                    number.get_value(),
+                    square.get_fill_color().to_hex(),
+                    square.get_fill_opacity(),
+                ]
+                for square, number in row
+            ]
+            for row in self.get_vgroup()
+        ]
+        return {
+            "entries": self._entries.tolist(),
+            "cells": cells,
+            "center": self.get_vgroup().get_center().tolist(),
+        }
+
+    def set_state(self, state):
+        self._set_entries(np.array(state["entries"]))
+        for row, cells in zip(self.get_vgroup(), state["cells"]):
+            for (square, number), (value, color, opacity) in zip(row, cells):
+                if number.get_value() != value:
+                    number.set_value(value)
+                square.set_fill(color, opacity)
+        self.get_vgroup().move_to(state["center"])
+        self._dirty.clear()
+
+    def _set_entries(self, entries):
+        self._entries[...] = entries
+
+    def set_entry(self, i, j, val: float):
+        self._entries[i][j] = val
+
+    def animate_set_entry(self, i, j, val: float):
+        self.set_entry(i, j, val)
+        square, number = self.get_vgroup()[i][j]
+        return ValueFade(number, val)
+
+    def animate_set_entries(self, rows, cols, vals):
+        return [
+            self.animate_set_entry(i, j, val) for i, j, val in zip(rows, cols, vals)
+        ]
+
+    def get_nrows(self):
+        return len(self._entries)
+
+    def get_ncols(self):
+        return len(self._entries[0])
+
+    def animate_highlight_neighbors(self, i, j, stencil=FIVE_POINT):
+        rows, cols = stencil.neighbors(i, j, (self.get_nrows(), self.get_ncols()))
+        return self.animate_highlight_entries(rows.tolist(), cols.tolist())
+
+    def animate_highlight_entry(self, i, j):
+        self._dirty.add((i, j))
+        square, number = self.get_vgroup()[i][j]
+        highlight_anim = SetFill(square, YELLOW, 0.3)
+
+        return highlight_anim
+
+    def animate_highlight_entries(self, rows, cols):
+        return [self.animate_highlight_entry(i, j) for i, j in zip(rows, cols)]
+
+    def animate_reset_fill(self):
+        """
+        Resets the cells highlighted since their last reset, as one animation
+        """
+        anims = [self.animate_reset_entry_fill(i, j) for i, j in sorted(self._dirty)]
+        return [AnimationGroup(*anims)] if anims else []
+
+    def animate_reset_entry_fill(self, i, j):
+        self._dirty.discard((i, j))
+        square, number = self.get_vgroup()[i][j]
+        highlight_anim = SetFill(square, self.fill, self.opacity)
+
+        return highlight_anim
+
+    def animate_reset_entries_fill(self, rows, cols):
+        return [self.animate_reset_entry_fill(i, j) for i, j in zip(rows, cols)]
+
+
+def _owned_cells(chunk):
+    # Mask of the cells of a chunk that it owns, the rest are its halo
+    owned = np.zeros(chunk.shape, dtype=bool)
+    owned[chunk.local_owned_slices] = True
+    return owned
+
+
+class ChunkView(Grid):
+    """
+    One chunk of a parent Grid, without copying it: entries are a NumPy view of
+    the parent's array and owned cells are the parent's cell mobjects.
+    Halo cells alias their owner's entries, so only the owner writes them, but
+    have their own mobjects, which are drawn next to the owner's and show its
+    value as of the last halo exchange.
+    """
+
+    def __init__(self, parent: Grid, chunk, fill, opacity):
+        self.parent = parent
+        self.chunk = chunk
+        self._entries = parent.get_entries()[chunk.slices]
+        self.cell_size = parent.cell_size
+        self.fill = fill
+        self.opacity = opacity
+        self._dirty = set()
+        self.owned = _owned_cells(chunk)
+
+        parent_rows = parent.get_vgroup()
+        self.halo_cells = VGroup()
+        self._grid_vgroup = VGroup()
+        for i in range(chunk.shape[0]):
+            parent_row = parent_rows[chunk.start[0] + i]
+            row = VGroup()
+            for j in range(chunk.shape[1]):
+                cell = parent_row[chunk.start[1] + j]
+                if not self.owned[i, j]:
+                    cell = cell.copy()
+                    cell[0].set_fill(fill, opacity)
+                    self.halo_cells.add(cell)
+                row.add(cell)
+            self._grid_vgroup.add(row)
+
+    def set_entry(self, i, j, val: float):
+        # Halo entries are the owner's; their cells still show val
+        if self.owned[i, j]:
+            self._entries[i, j] = val
+
+    def _set_entries(self, entries):
+        self._entries[self.owned] = entries[self.owned]
+
+    def animate_show(self):
+        """
+        Fills the owned cells with the chunk colour and fades in the halo cells
+        """
+        anims = [
+            SetFill(self.get_vgroup()[i][j][0], self.fill, self.opacity)
+            for i, j in zip(*np.nonzero(self.owned))
+        ]
+        if len(self.halo_cells):
+            anims.append(FadeIn(self.halo_cells))
+        return anims
+
+
+class _GridRow:
+    def __init__(self, grid_mobject, i):
+        self._grid_mobject = grid_mobject
+        self._i = i
+
+    def __getitem__(self, j):
+        return self._grid_mobject.get_cell(self._i, j)
+
+    def __len__(self):
+        return self._grid_mobject.n_cols
+
+
+class ArrayGridMobject(VGroup):
+    """
+    Mobject for an ArrayGrid: one background rectangle for the base fill, one path
+    for every grid line and one number per cell. Square cells are only built when
+    indexed with grid_mobject[i][j], so animations can still address single cells.
+    """
+
+    def __init__(
+        self,
+        entries,
+        cell_size,
+        fill=None,
+        fill_opacity=0,
+        show_values=True,
+        numbers=None,
+    ):
+        super().__init__()
+        self.n_rows, self.n_cols = entries.shape
+        self.cell_size = cell_size
+        self.show_values = show_values
+
+        width = self.n_cols * cell_size
+        height = self.n_rows * cell_size
+        self.background = Rectangle(width=width, height=height, stroke_width=0)
+        self.background.set_fill(fill, opacity=fill_opacity)
+        self.lines = self._create_lines(width, height)
+        self.lines.move_to(self.background.get_center())
+        self.cells = VGroup()
+        self._cells = {}
+        self.numbers = VGroup()
+        if numbers is not None:
+            # Numbers of another grid, already centred on the cells this one covers
+            self.numbers.add(*numbers)
+            center = (numbers[0].get_center() + numbers[-1].get_center()) / 2
+            self.background.move_to(center)
+            self.lines.move_to(center)
+        elif show_values:
+            centers = self.get_cell_centers()
+            for i in range(self.n_rows):
+                for j in range(self.n_cols):
+                    self.numbers.add(NumberCell(entries[i, j]).move_to(centers[i, j]))
+
+        # Numbers go last so they stay on top of fills and lines
+        self.add(self.background, self.cells, self.lines, self.numbers)
+
+    def _create_lines(self, width, height):
+        xs = np.arange(self.n_cols + 1) * self.cell_size
+        ys = -np.arange(self.n_rows + 1) * self.cell_size
+        starts = np.concatenate(
+            [
+                np.stack([np.zeros_like(ys), ys, np.zeros_like(ys)], axis=1),
+                np.stack([xs, np.zeros_like(xs), np.zeros_like(xs)], axis=1),
+            ]
+        )
+        ends = np.concatenate(
+            [
+                np.stack([np.full_like(ys, width), ys, np.zeros_like(ys)], axis=1),
+                np.stack([xs, np.full_like(xs, -height), np.zeros_like(xs)], axis=1),
+            ]
+        )
+        # Each line is one straight cubic curve; disjoint curves form separate subpaths
+        t = np.linspace(0, 1, 4)[None, :, None]
+        points = starts[:, None, :] + t * (ends - starts)[:, None, :]
+        lines = VMobject(stroke_color=BLUE, fill_opacity=0)
+        lines.set_points(points.reshape(-1, 3))
+        return lines
+
+    def get_cell_centers(self):
+        ul = self.background.get_corner(UL)
+        i = np.arange(self.n_rows)[:, None, None]
+        j = np.arange(self.n_cols)[None, :, None]
+        return ul + self.cell_size * ((j + 0.5) * RIGHT + (i + 0.5) * DOWN)
+
+    def get_cell_center(self, i, j):
+        return self.background.get_corner(UL) + self.cell_size * (
+            (j + 0.5) * RIGHT + (i + 0.5) * DOWN
+        )
+
+    def get_cell(self, i, j) -> VGroup:
+        i %= self.n_rows
+        j %= self.n_cols
+        cell = self._cells.get((i, j))
+        if cell is None:
+            center = self.get_cell_center(i, j)
+            square = Square(side_length=self.cell_size, stroke_width=0)
+            square.set_fill(self.background.get_fill_color(), opacity=0)
+            square.move_to(center)
+            if self.show_values:
+                number = self.numbers[i * self.n_cols + j]
+            else:
+                number = VMobject().move_to(center)
+            cell = VGroup(square, number)
+            self._cells[(i, j)] = cell
+            self.cells.add(cell)
+        return cell
+
+    def get_materialized_cells(self):
+        return list(self._cells.values())
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return _GridRow(self, int(i) % self.n_rows)
+        return super().__getitem__(i)
+
+
+class ArrayGrid(Grid):
+    """
+    Grid whose values live in a 2-D NumPy array and whose cells share one
+    vectorized mobject, for domains too large for one Square per cell.
+    """
+
+    def __init__(self, entries, cell_size, fill, opacity, show_values=True):
+        self._entries = np.array(entries)
+        self.cell_size = cell_size
+        self._grid_vgroup = ArrayGridMobject(
+            self._entries, cell_size, fill, opacity, show_values
+        )
+        self.fill = fill
+        self.opacity = opacity
+        self._dirty = set()
+
+    def set_entry(self, i, j, val: float):
+        self._entries[i, j] = val
+
+    def view(self, chunk, fill, opacity):
+        return ArrayChunkView(self, chunk, fill, opacity)
+
+    def get_state(self):
+        mobject = self.get_vgroup()
+        # Only cells that were ever indexed have a fill of their own
+        fills = [
+            [i, j, square.get_fill_color().to_hex(), square.get_fill_opacity()]
+            for (i, j), (square, number) in mobject._cells.items()
+        ]
+        return {
+            "entries": self._entries.tolist(),
+            "values": [number.get_value() for number in mobject.numbers],
+            "fills": fills,
+            "center": mobject.get_center().tolist(),
+        }
+
+    def set_state(self, state):
+        mobject = self.get_vgroup()
+        self._set_entries(np.array(state["entries"]))
+        for number, value in zip(mobject.numbers, state["values"]):
+            if number.get_value() != value:
+                number.set_value(value)
+        for i, j, color, opacity in state["fills"]:
+            mobject[i][j][0].set_fill(color, opacity)
+        mobject.move_to(state["center"])
+        self._dirty.clear()
+
+    def animate_set_entry(self, i, j, val: float):
+        if not self.get_vgroup().show_values:
+            self.set_entry(i, j, val)
+            return Wait()
+        return super().animate_set_entry(i, j, val)
+
+    def get_nrows(self):
+        return self._entries.shape[0]
+
+    def get_ncols(self):
+        return self._entries.shape[1]
+
+    def animate_reset_entry_fill(self, i, j):
+        # Base fill is drawn by the background, so cells only clear their overlay
+        self._dirty.discard((i, j))
+        square, number = self.get_vgroup()[i][j]
+        return SetFill(square, self.fill, 0)
+
+
+class ArrayChunkView(ArrayGrid):
+    """
+    One chunk of a parent ArrayGrid. As in ChunkView, entries are a NumPy view
+    of the parent's array, owned cells show the parent's numbers and halo cells
+    copies of them, but the background and grid lines are the chunk's own.
+    """
+
+    def __init__(self, parent: ArrayGrid, chunk, fill, opacity):
+        self.parent = parent
+        self.chunk = chunk
+        self._entries = parent.get_entries()[chunk.slices]
+        self.cell_size = parent.cell_size
+        self.fill = fill
+        self.opacity = opacity
+        self._dirty = set()
+        self.owned = _owned_cells(chunk)
+
+        parent_mobject = parent.get_vgroup()
+        numbers = None
+        self.halo_numbers = VGroup()
+        if parent_mobject.show_values:
+            numbers = []
+            for i, j in np.ndindex(chunk.shape):
+                k = (chunk.start[0] + i) * parent_mobject.n_cols + chunk.start[1] + j
+                number = parent_mobject.numbers[k]
+                if not self.owned[i, j]:
+                    number = number.copy()
+                    self.halo_numbers.add(number)
+                numbers.append(number)
+        self._grid_vgroup = ArrayGridMobject(
+            self._entries, self.cell_size, fill, opacity, numbers is not None, numbers
+        )
+        if numbers is None:
+            parent._place_view(self, chunk)
+
+    def set_entry(self, i, j, val: float):
+        # Halo entries are the owner's; their numbers still show val
+        if self.owned[i, j]:
+            self._entries[i, j] = val
+
+    def _set_entries(self, entries):
+        self._entries[self.owned] = entries[self.owned]
+
+    def animate_show(self):
+        """
+        Fades in the chunk's background, grid lines and halo numbers
+        """
+        mobject = self.get_vgroup()
+        anims = [FadeIn(mobject.background), FadeIn(mobject.lines)]
+        if len(self.halo_numbers):
+            anims.append(FadeIn(self.halo_numbers))
+        return anims
+
+
+# Grids with more cells than this are drawn as a heatmap by lod_grid
+LOD_MAX_CELLS = 32 * 32
+HEATMAP_COLORS = (BLUE_E, TEAL, YELLOW)
+
+
+def colormap(values, vmin, vmax, colors=HEATMAP_COLORS):
+    """
+    Maps values linearly onto a gradient through colors, as uint8 RGBA
+    """
+    anchors = np.array([color.to_rgb() for color in colors])
+    t = np.clip((np.asarray(values, dtype=float) - vmin) / (vmax - vmin), 0, 1)
+    t *= len(anchors) - 1
+    k = np.minimum(t.astype(int), len(anchors) - 2)
+    frac = (t - k)[..., None]
+    rgb = anchors[k] * (1 - frac) + anchors[k + 1] * frac
+    alpha = np.ones(rgb.shape[:-1] + (1,))
+    return (np.concatenate([rgb, alpha], axis=-1) * 255).astype(np.uint8)
+
+
+class PixelFade(Animation):
+    """
+    Cross-fades some pixels of an ImageMobject to new RGBA colors
+    """
+
+    def __init__(self, image: ImageMobject, rows, cols, colors, **kwargs):
+        super().__init__(image, **kwargs)
+        self.rows = np.asarray(rows)
+        self.cols = np.asarray(cols)
+        self.colors = np.broadcast_to(colors, self.rows.shape + (4,)).astype(float)
+
+    def begin(self):
+        pixels = self.mobject.pixel_array[self.rows, self.cols]
+        self.start_colors = pixels.astype(float)
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alpha = self.rate_func(alpha)
+        colors = self.start_colors + (self.colors - self.start_colors) * alpha
+        self.mobject.pixel_array[self.rows, self.cols] = colors.astype(np.uint8)
+
+
+class HeatmapGrid(Grid):
+    """
+    Level-of-detail Grid: the entries array is drawn as a single image with one
+    pixel per cell, so the mobject count does not depend on the grid size.
+    Cell numbers are not drawn and updates are array writes that fade the
+    affected pixels. Cells can not be indexed through get_vgroup().
+    """
+
+    def __init__(self, entries, cell_size, fill, opacity, vmin=None, vmax=None):
+        self._entries = np.array(entries)
+        self._init_image(cell_size, fill, opacity, vmin, vmax)
+
+    def _init_image(self, cell_size, fill, opacity, vmin, vmax):
+        self.fill = fill
+        self.opacity = opacity
+        self._dirty = set()
+        self.vmin = self._entries.min() if vmin is None else vmin
+        self.vmax = self._entries.max() if vmax is None else vmax
+        if self.vmax <= self.vmin:
+            self.vmax = self.vmin + 1
+
+        self.cell_size = cell_size
+        n_rows, n_cols = self._entries.shape
+        self.image = ImageMobject(self.get_colors())
+        self.image.set_resampling_algorithm(RESAMPLING_ALGORITHMS["nearest"])
+        self.image.stretch_to_fit_width(n_cols * cell_size)
+        self.image.stretch_to_fit_height(n_rows * cell_size)
+        border = Rectangle(width=n_cols * cell_size, height=n_rows * cell_size)
+        border.set_stroke(fill if fill is not None else BLUE)
+        border.move_to(self.image)
+        self._grid_vgroup = Group(self.image, border)
+
+    def get_values(self, rows=slice(None), cols=slice(None)):
+        return self._entries[rows, cols]
+
+    def get_colors(self, rows=slice(None), cols=slice(None)):
+        return colormap(self.get_values(rows, cols), self.vmin, self.vmax)
+
+    def set_entry(self, i, j, val: float):
+        self.set_entries([i], [j], [val])
+
+    def set_entries(self, rows, cols, vals):
+        self._entries[rows, cols] = vals
+
+    def view(self, chunk, fill, opacity):
+        return HeatmapChunkView(self, chunk, fill, opacity)
+
+    def get_state(self):
+        return {
+            "entries": self.get_values().tolist(),
+            "center": self.get_vgroup().get_center().tolist(),
+        }
+
+    def set_state(self, state):
+        # Pixels only ever show the entries' colors or a highlight of them
+        self._set_entries(np.array(state["entries"]))
+        self.image.pixel_array[...] = self.get_colors()
+        self.get_vgroup().move_to(state["center"])
+        self._dirty.clear()
+
+    def animate_set_entry(self, i, j, val: float):
+        return self.animate_set_entries([i], [j], [val])[0]
+
+    def animate_set_entries(self, rows, cols, vals):
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        self.set_entries(rows, cols, vals)
+        return [PixelFade(self.image, rows, cols, self.get_colors(rows, cols))]
+
+    def get_nrows(self):
+        return self._entries.shape[0]
+
+    def get_ncols(self):
+        return self._entries.shape[1]
+
+    def _animate_highlight(self, rows, cols):
+        self._dirty.update(zip(np.ravel(rows).tolist(), np.ravel(cols).tolist()))
+        base = self.get_colors(rows, cols).astype(float)
+        highlight = np.append(YELLOW.to_rgb(), 1) * 255
+        colors = base * 0.7 + highlight * 0.3
+        return PixelFade(self.image, rows, cols, colors)
+
+    def animate_highlight_entry(self, i, j):
+        return self._animate_highlight([i], [j])
+
+    def animate_highlight_entries(self, rows, cols):
+        return [self._animate_highlight(np.asarray(rows), np.asarray(cols))]
+
+    def animate_reset_fill(self):
+        if not self._dirty:
+            return []
+        return self.animate_reset_entries_fill(*zip(*sorted(self._dirty)))
+
+    def animate_reset_entry_fill(self, i, j):
+        return self.animate_reset_entries_fill([i], [j])[0]
+
+    def animate_reset_entries_fill(self, rows, cols):
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        self._dirty.difference_update(zip(rows.tolist(), cols.tolist()))
+        return [PixelFade(self.image, rows, cols, self.get_colors(rows, cols))]
+
+
+class HeatmapChunkView(HeatmapGrid):
+    """
+    One chunk of a parent HeatmapGrid, drawn on the parent's color scale. The
+    image is the chunk's own, but entries are a NumPy view of the parent's array
+    as in ChunkView. Only the owner writes halo entries, so the values the halo
+    cells show are kept here, by cell.
+    """
+
+    def __init__(self, parent: HeatmapGrid, chunk, fill, opacity):
+        self.parent = parent
+        self.chunk = chunk
+        self._entries = parent.get_entries()[chunk.slices]
+        self.owned = _owned_cells(chunk)
+        self._halo = {
+            (i, j): self._entries[i, j] for i, j in zip(*np.nonzero(~self.owned))
+        }
+        self._init_image(parent.cell_size, fill, opacity, parent.vmin, parent.vmax)
+        parent._place_view(self, chunk)
+
+    def get_values(self, rows=slice(None), cols=slice(None)):
+        values = np.array(self._entries[rows, cols])
+        halo = ~self.owned[rows, cols]
+        i, j = np.indices(self.owned.shape)[:, rows, cols]
+        values[halo] = [self._halo[cell] for cell in zip(i[halo], j[halo])]
+        return values
+
+    def set_entries(self, rows, cols, vals):
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        vals = np.broadcast_to(vals, rows.shape)
+        owned = self.owned[rows, cols]
+        self._entries[rows[owned], cols[owned]] = vals[owned]
+        self._halo.update(zip(zip(rows[~owned], cols[~owned]), vals[~owned]))
+
+    def _set_entries(self, entries):
+        self._entries[self.owned] = entries[self.owned]
+        self._halo = {cell: entries[cell] for cell in self._halo}
+
+
+def lod_grid(entries, cell_size, fill, opacity, max_cells=LOD_MAX_CELLS):
+    """
+    Grid for small domains, HeatmapGrid once there are more than max_cells cells
+    """
+    n_cells = len(entries) * len(entries[0])
+    if n_cells > max_cells:
+        return HeatmapGrid(entries, cell_size, fill, opacity)
+    return Grid(entries, cell_size, fill, opacity)
+
+
+def create_gpu_rect(chunk_shape, cell_size, buffers=1):
+    """
+    GPU memory box with its label, wide enough for buffers chunks of chunk_shape
+    """
+    n_rows, n_cols = chunk_shape
+
+    padding_x = 0.1
+    padding_y = 0.08
+    gpu_rect = Rectangle(
+        width=(1 + padding_x) * cell_size * n_cols * buffers,
+        height=(1 + padding_y) * cell_size * n_rows,
+    )
+    gpu_rect.to_edge(RIGHT, buff=2)
+
+    # GPU label
+    gpu_label = Text("GPU", font_size=36)
+    gpu_label.next_to(gpu_rect, UP, buff=0.2)  # position above the rectangle
+
+    return gpu_rect, gpu_label
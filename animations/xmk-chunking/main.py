@@ -1,470 +1,598 @@
-from manim import *
-
-
-class Grid:
-
-    def __init__(self, entries, cell_size, fill, opacity):
-        self._entries = entries
-        self._grid_vgroup = self._create_grid_vgroup(entries, cell_size, fill, opacity)
-        self.fill = fill
-        self.opacity = opacity
-
-    def _create_grid_vgroup(self, entries, cell_size, fill=None, fill_opacity=1):
-        n_rows = len(entries)
-        n_cols = len(entries[0])
-        grid = VGroup()
-        for i in range(n_rows):
-            row = VGroup()
-            for j in range(n_cols):
-                square = Square(side_length=cell_size, color=BLUE)
-                square.set_fill(fill, opacity=fill_opacity)
-                number = Text(str(entries[i][j])).scale(0.5)
-                number.move_to(square.get_center())
-                row.add(VGroup(square, number))
-            row.arrange(RIGHT, buff=0)
-            grid.add(row)
-        grid.arrange(DOWN, buff=0)
-        return grid
-
-    def get_vgroup(self) -> VGroup:
-        return self._grid_vgroup
-
-    def get_entries(self):
-        return self._entries
-
-    def set_entry(self, i, j, val: float):
-        self._entries[i][j] = val
-
-    def animate_set_entry(self, i, j, val: float):
-        self.set_entry(i, j, val)
-        square, number = self.get_vgroup()[i][j]
-        return Transform(number, Text(str(val)).scale(0.5).move_to(square.get_center()))
-
-    def get_nrows(self):
-        return len(self._entries)
-
-    def get_ncols(self):
-        return len(self._entries[0])
-
-    def animate_highlight_neighbors(self, i, j):
-        neighbors = []
-
-        # Collect neighboring cells (up, down, left, right)
-        if i > 0:
-            neighbors.append(self.get_vgroup()[i - 1][j])
-        if i < self.get_nrows() - 1:
-            neighbors.append(self.get_vgroup()[i + 1][j])
-        if j > 0:
-            neighbors.append(self.get_vgroup()[i][j - 1])
-        if j < self.get_ncols() - 1:
-            neighbors.append(self.get_vgroup()[i][j + 1])
-
-        # Animate neighbor highlight
-        neighbors_colors = [neighbor.get_fill_color() for neighbor in neighbors]
-        neighbors_opacities = [neighbor.get_fill_opacity() for neighbor in neighbors]
-        highlight_anims = [
-            neighbor[0].animate.set_fill(YELLOW, opacity=0.3) for neighbor in neighbors
+import inspect
+import os
+from itertools import cycle
+
+import numpy as np
+from manim import (
+    BLUE,
+    DEFAULT_MOBJECT_TO_MOBJECT_BUFFER,
+    DOWN,
+    GOLD,
+    GREEN,
+    LEFT,
+    MAROON,
+    ORANGE,
+    PINK,
+    PURPLE,
+    RIGHT,
+    TEAL,
+    UL,
+    UP,
+    AnimationGroup,
+    Create,
+    FadeIn,
+    Rectangle,
+    Succession,
+    Text,
+    VGroup,
+    Write,
+    config,
+)
+
+from common import TIMINGS_ENV
+from costs import CostModel, format_si
+from glyphs import NumberCell, ValueFade, warm_glyphs, warm_text_cache
+from grid import ArrayGrid, Grid, create_gpu_rect, lod_grid
+from scheduler import AnimationScheduler, MoveTo
+from sections import SectionedScene
+from spec import DEFAULTS, KEYS, load_specs
+from stencil import STENCILS, Compute, Download, HaloCopy, StencilEngine, Upload
+from timings import MeasuredTimings
+
+
+class ChunkingScene(SectionedScene):
+    """
+    Chunked stencil run on a CPU grid and a GPU, set up by its class attributes.
+    The scenes themselves are declared in scenes.toml, see spec.py.
+    """
+
+    # ArrayGrid keeps entries in a NumPy array and draws all cells as one mobject,
+    # lod_grid switches to a HeatmapGrid for large domains. Factory functions
+    # like lod_grid are called as is, see __init_subclass__
+    grid_class = Grid
+    grid_size = DEFAULTS["grid_size"]
+    # Initial values as a list of rows, instead of the grid_size default
+    entries = None
+    # (row chunks, column chunks)
+    layout = tuple(DEFAULTS["layout"])
+    stencil = STENCILS[DEFAULTS["stencil"]]
+    # None: as wide as the stencil radius
+    halo_width = None
+    temporal_blocking = 1
+    rounds = 4
+    # Seconds of animation per chunk transfer, per bulk compute sweep and per
+    # halo exchange
+    upload_time = 1
+    download_time = 1
+    compute_time = 1
+    halo_time = 1
+    # Overlap transfers with compute, using two chunk buffers on the GPU
+    pipelined = False
+    # Profiler export (CSV or Chrome trace, see timings.py) whose measured
+    # durations replace the run times above, squeezed into timings_duration
+    # seconds. XMK_TIMINGS overrides it.
+    timings_file = None
+    timings_duration = 30
+    timings_exponent = 1.0
+    timings = None
+    round = 0
+    # Live counters of the analytical cost model (see costs.py), for a GPU with
+    # this host <-> device bandwidth in bytes/s and FLOP rate
+    show_costs = True
+    bandwidth = 16e9
+    flop_rate = 1e12
+    chunk_colors = [BLUE, GREEN, TEAL, PURPLE, ORANGE, MAROON, GOLD, PINK]
+    cost_labels = {
+        "transferred": "Transferred",
+        "halo": "Halo copies",
+        "redundant": "Redundant FLOPs",
+    }
+    # Shape every number and label in a process pool before the first frame;
+    # heatmap grids show no numbers and can turn it off
+    warm_text = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A plain function would become a method and get the scene as entries
+        grid_class = cls.__dict__.get("grid_class")
+        if inspect.isfunction(grid_class):
+            cls.grid_class = staticmethod(grid_class)
+
+    def get_initial_entries(self):
+        if self.entries is not None:
+            return [list(row) for row in self.entries]
+        # Ones surrounded by a fixed boundary of zeros, one stencil radius wide
+        n = self.grid_size
+        r = self.stencil.radius
+        return [
+            [int(r <= i < n - r and r <= j < n - r) for j in range(n)] for i in range(n)
         ]
 
-        return highlight_anims
-
-    def animate_highlight_entry(self, i, j):
-        # Animate highlight
-        square, number = self.get_vgroup()[i][j]
-        highlight_anim = square.animate.set_fill(YELLOW, opacity=0.3)
-
-        return highlight_anim
+    def load_timings(self):
+        path = os.environ.get(TIMINGS_ENV, self.timings_file)
+        if not path:
+            return None
+        return MeasuredTimings.load(
+            path, duration=self.timings_duration, exponent=self.timings_exponent
+        )
 
-    def animate_reset_fill(self):
+    def measured_run_time(self, kind, default, chunk=None, index=0):
+        """
+        Measured run time of a step in the current round, if there are timings
+        """
+        if self.timings is None:
+            return default
+        run_time = self.timings.run_time(kind, self.round, chunk, index)
+        return default if run_time is None else run_time
+
+    @property
+    def gpu_buffers(self):
+        return 2 if self.pipelined else 1
+
+    def create_cost_panel(self):
+        """
+        Counters of the bytes moved and redundant FLOPs so far, with the model's
+        time per step for this blocking depth and for the best one
+        """
+        self.cost_totals = {"transferred": 0, "halo": 0, "redundant": 0}
+        self.cost_counters = {}
+        counters = VGroup()
+        for name, label in self.cost_labels.items():
+            # Laid out for a wide value, so the counters grow into their space
+            wide = self.format_cost(name, 888e3)
+            counter = NumberCell(wide, scale=0.4, aligned_edge=LEFT)
+            self.cost_counters[name] = counter
+            counters.add(VGroup(Text(label, font_size=20), counter).arrange(RIGHT))
+        counters.arrange(RIGHT, buff=0.5)
+        for name, counter in self.cost_counters.items():
+            counter.set_value(self.format_cost(name, 0))
+
+        best = self.cost_model.optimal_depth()
+        estimate = (
+            f"{format_si(self.costs.time_per_step, 's')} per step at depth "
+            f"{self.temporal_blocking}, best depth {best.depth} "
+            f"({format_si(best.time_per_step, 's')})"
+        )
+        panel = VGroup(counters, Text(estimate, font_size=20))
+        panel.arrange(DOWN, aligned_edge=LEFT)
+        # Below the grid, clear of its bottom row
+        panel.next_to(self.grid.get_vgroup(), DOWN, aligned_edge=LEFT)
+        return panel
+
+    def format_cost(self, name, value):
+        return format_si(value, "FLOP" if name == "redundant" else "B")
+
+    def animate_costs(self, **increments):
+        """
+        Adds to the cost counters, e.g. animate_costs(transferred=n_bytes)
+        """
+        if not self.show_costs:
+            return []
         anims = []
-
-        for row in self.get_vgroup():
-            for cell in row:
-                square, _ = cell
-                anims.append(square.animate.set_fill(self.fill, self.opacity))
-
+        for name, value in increments.items():
+            self.cost_totals[name] += value
+            value = self.format_cost(name, self.cost_totals[name])
+            anims.append(ValueFade(self.cost_counters[name], value))
         return anims
 
-    def animate_reset_entry_fill(self, i, j):
-        square, number = self.get_vgroup()[i][j]
-        highlight_anim = square.animate.set_fill(self.fill, self.opacity)
-
-        return highlight_anim
-
+    def phase_inputs(self, chunks: list[Grid]):
+        # The state a phase starts from; the scene's settings are in
+        # checkpoint_inputs, see SectionedScene.next_phase
+        return dict(
+            entries=[chunk.get_entries() for chunk in chunks],
+            chunks=self.engine.chunks,
+            stencil=self.stencil.offsets,
+            temporal_blocking=self.temporal_blocking,
+            timings=self.timings.digest if self.timings else None,
+            costs=self.cost_totals if self.show_costs else None,
+            # Measured run times are per round
+            round=self.round,
+        )
 
-class Chunking5p(Scene):
-    def create_gpu_rect(self, entries, cell_size, halo_width):
-        n_cols = len(entries[0])
-        mid_col = n_cols // 2 + n_cols % 2
+    def checkpoint_inputs(self):
+        inputs = {key: getattr(self, key) for key in KEYS}
+        inputs["grid_class"] = self.grid_class.__name__
+        inputs["stencil"] = self.stencil.offsets
+        inputs["timings"] = self.timings.digest if self.timings else None
+        inputs["chunk_colors"] = [str(color) for color in self.chunk_colors]
+        inputs["cost_labels"] = self.cost_labels
+        return inputs
+
+    def get_scene_state(self):
+        """
+        State at the end of a round, for save_checkpoint: the chunks' entries,
+        fills and positions and the cost counters
+        """
+        return {
+            "round": self.round,
+            "chunks": [chunk.get_state() for chunk in self.chunks],
+            "costs": self.cost_totals if self.show_costs else None,
+        }
+
+    def set_scene_state(self, state):
+        for chunk, chunk_state in zip(self.chunks, state["chunks"]):
+            chunk.set_state(chunk_state)
+        if self.show_costs:
+            self.cost_totals = state["costs"]
+            for name, counter in self.cost_counters.items():
+                counter.set_value(self.format_cost(name, self.cost_totals[name]))
+
+    def play_intro(self, cpu_label, gpu_rect, gpu_label, cost_panel):
+        self.next_phase("intro", self.play_intro, **self.phase_inputs(self.chunks))
+        grid, chunks = self.grid, self.chunks
+        self.play(FadeIn(grid.get_vgroup()), FadeIn(cpu_label))
+        if cost_panel is not None:
+            self.play(Create(gpu_rect), Write(gpu_label), FadeIn(cost_panel))
+        else:
+            self.play(Create(gpu_rect), Write(gpu_label))
 
-        padding_x = 0.1
-        padding_y = 0.08
-        gpu_rect = Rectangle(
-            width=(1 + padding_x) * cell_size * (mid_col + halo_width),
-            height=(1 + padding_y) * cell_size * len(entries),
+        self.play(
+            Succession(*[AnimationGroup(*chunk.animate_show()) for chunk in chunks])
         )
-        gpu_rect.to_edge(RIGHT, buff=2)
-
-        # GPU label
-        gpu_label = Text("GPU", font_size=36)
-        gpu_label.next_to(gpu_rect, UP, buff=0.2)  # position above the rectangle
-
-        return gpu_rect, gpu_label
-
-    def run_chunks(self, left_chunk: Grid, right_chunk: Grid, gpu_rect: Rectangle):
-        # Save chunks position
-        left_pos = left_chunk.get_vgroup().get_center()
-        # Move chunk to gpu
-        anim = left_chunk.get_vgroup().animate.move_to(gpu_rect.get_center())
-        self.play(anim, run_time=1)
-        x_m = 1
-        x_M = left_chunk.get_nrows() - 2
-        y_m = 1
-        y_M = left_chunk.get_ncols() - 2
-        anims = []
-        for x in range(x_m, x_M + 1):
-            for y in range(y_m, y_M + 1):
-                set_entry_anim = left_chunk.animate_set_entry(
-                    x, y, left_chunk.get_entries()[x][y] + 1
-                )
-                if x * left_chunk.get_ncols() + y < 5 + left_chunk.get_ncols():
-                    highlight_anim = left_chunk.animate_highlight_neighbors(x, y)
-                    self.play(highlight_anim, set_entry_anim, run_time=0.2)
-                    anim = left_chunk.animate_reset_fill()
-                    self.play(anim, run_time=0.2)
-                    self.play(set_entry_anim, run_time=0.2)
-                else:
-                    anims.append(set_entry_anim)
-        self.play(*anims, run_time=1)
-        # Restore chunks position
-        self.play(left_chunk.get_vgroup().animate.move_to(left_pos), run_time=1)
-
-        # Save chunks position
-        right_pos = right_chunk.get_vgroup().get_center()
-        # Move chunk to gpu
-        anim = right_chunk.get_vgroup().animate.move_to(gpu_rect.get_center())
-        self.play(anim, run_time=1)
-        x_m = 1
-        x_M = right_chunk.get_nrows() - 2
-        y_m = 1
-        y_M = right_chunk.get_ncols() - 2
-        anims = []
-        for x in range(x_m, x_M + 1):
-            for y in range(y_m, y_M + 1):
-                set_entry_anim = right_chunk.animate_set_entry(
-                    x, y, right_chunk.get_entries()[x][y] + 1
-                )
-                if x * right_chunk.get_ncols() + y < 5 + right_chunk.get_ncols():
-                    highlight_anim = right_chunk.animate_highlight_neighbors(x, y)
-                    self.play(highlight_anim, set_entry_anim, run_time=0.2)
-                    anim = right_chunk.animate_reset_fill()
-                    self.play(anim, run_time=0.2)
-                    self.play(set_entry_anim, run_time=0.2)
+        # The chunks cover the whole grid, so it can go without a fade. Removing
+        # first keeps the cells the chunks share with it in the scene.
+        self.remove(grid.get_vgroup(), *[chunk.get_vgroup() for chunk in chunks])
+        self.add(*[chunk.get_vgroup() for chunk in chunks])
+
+    def compute_schedule(self, chunk: Grid, computes) -> AnimationScheduler:
+        """
+        Animates a chunk's Compute events: the first cells one at a time with
+        their stencil highlighted, the rest of each sweep at once. With measured
+        timings every sweep is one step as long as its kernel.
+        """
+        schedule = AnimationScheduler()
+        walkthrough = self.timings is None
+        for event in computes:
+            rows, cols, vals = [], [], []
+            for x, y, val in zip(
+                event.rows.tolist(), event.cols.tolist(), event.values.tolist()
+            ):
+                if walkthrough and x * chunk.get_ncols() + y < 5 + chunk.get_ncols():
+                    set_entry_anim = chunk.animate_set_entry(x, y, val)
+                    highlight_anim = chunk.animate_highlight_neighbors(
+                        x, y, self.stencil
+                    )
+                    schedule.add(
+                        *highlight_anim, set_entry_anim, run_time=self.sub_step(0.2)
+                    )
+                    schedule.add(
+                        *chunk.animate_reset_fill(), run_time=self.sub_step(0.2)
+                    )
+                    if not self.collapse_steps:
+                        schedule.pause(0.2)
                 else:
-                    anims.append(set_entry_anim)
-        self.play(*anims, run_time=1)
-        # Restore chunks position
-        self.play(right_chunk.get_vgroup().animate.move_to(right_pos), run_time=1)
-
-    def exchange_halos(self, left_chunk: Grid, right_chunk: Grid):
-        right_pos = right_chunk.get_vgroup().get_center()
-        self.play(right_chunk.get_vgroup().animate.next_to(left_chunk.get_vgroup()))
-        x_m = 0
-        x_M = left_chunk.get_nrows() - 1
-        y_m = left_chunk.get_ncols() - 1
-        y_M = left_chunk.get_ncols() - 1
-        for x in range(x_m, x_M + 1):
-            for y in range(y_m, y_M + 1):
-                y_right = y - 2
-                set_entry_anim = left_chunk.animate_set_entry(
-                    x, y, right_chunk.get_entries()[x][y_right]
-                )
-                halo_data_anim = right_chunk.animate_highlight_entry(x, y_right)
+                    rows.append(x)
+                    cols.append(y)
+                    vals.append(val)
+            step = event.step % self.temporal_blocking
+            run_time = self.measured_run_time(
+                "compute", self.compute_time, event.chunk, step
+            )
+            schedule.add(
+                *chunk.animate_set_entries(rows, cols, vals), run_time=run_time
+            )
+        return schedule
+
+    def warm_texts(self, initial_entries, rounds):
+        """
+        Shapes the labels and every value the cells will show, from the initial
+        entries and the engine's trace, in parallel (see glyphs.warm_text_cache)
+        """
+        values = set(np.ravel(initial_entries).tolist())
+        for events in rounds:
+            for event in events:
+                if isinstance(event, (Compute, HaloCopy)):
+                    values.update(event.values.tolist())
+        warm_glyphs(sorted(values))
+        labels = [("CPU", {}), ("GPU", {"font_size": 36})]
+        if self.show_costs:
+            labels += [
+                (label, {"font_size": 20}) for label in self.cost_labels.values()
+            ]
+        warm_text_cache(labels)
+
+    @property
+    def collapse_steps(self):
+        return self.profile is not None and self.profile.collapse_steps
+
+    def sub_step(self, run_time):
+        """
+        Run time of a highlight or reset, a single frame in draft renders
+        """
+        if self.collapse_steps:
+            return 1 / config.frame_rate
+        return run_time
+
+    def get_upload_time(self, chunk):
+        return self.measured_run_time("upload", self.upload_time, chunk)
+
+    def get_download_time(self, chunk):
+        return self.measured_run_time("download", self.download_time, chunk)
+
+    def get_gpu_slots(self, gpu_rect: Rectangle):
+        # Centers of the gpu_buffers chunk buffers, side by side in the GPU
+        width = gpu_rect.width / self.gpu_buffers
+        return [
+            gpu_rect.get_left() + (k + 0.5) * width * RIGHT
+            for k in range(self.gpu_buffers)
+        ]
 
-                self.play(set_entry_anim, halo_data_anim, run_time=0.2)
+    def run_chunks(self, chunks: list[Grid], gpu_rect: Rectangle, events):
+        if self.pipelined:
+            return self.run_chunks_pipelined(chunks, gpu_rect, events)
+
+        chunk_pos = {}
+        computes = {}
+        for event in events:
+            if isinstance(event, Compute):
+                computes.setdefault(event.chunk, []).append(event)
+        for event in events:
+            if isinstance(event, Upload):
+                self.next_phase(
+                    f"upload_{event.chunk}",
+                    self.run_chunks,
+                    **self.phase_inputs(chunks),
+                )
+                chunk = chunks[event.chunk]
+                # Save chunk position
+                chunk_pos[event.chunk] = chunk.get_vgroup().get_center()
+                # Move chunk to gpu
+                anim = chunk.get_vgroup().animate.move_to(gpu_rect.get_center())
+                cost = self.costs.chunks[event.chunk]
                 self.play(
-                    right_chunk.animate_reset_entry_fill(x, y_right), run_time=0.2
+                    anim,
+                    *self.animate_costs(transferred=cost.transfer_bytes / 2),
+                    run_time=self.get_upload_time(event.chunk),
                 )
-        x_m = 0
-        x_M = left_chunk.get_nrows() - 1
-        y_m = 0
-        y_M = 0
-        for x in range(x_m, x_M + 1):
-            for y in range(y_m, y_M + 1):
-                y_left = y + 2
-                set_entry_anim = right_chunk.animate_set_entry(
-                    x, y, left_chunk.get_entries()[x][y_left]
+            elif isinstance(event, Download):
+                self.next_phase(
+                    f"compute_{event.chunk}",
+                    self.run_chunks,
+                    **self.phase_inputs(chunks),
+                )
+                chunk = chunks[event.chunk]
+                # The chunk stays put until Download, so its whole sweep is one play
+                schedule = self.compute_schedule(chunk, computes.get(event.chunk, []))
+                schedule.play(self)
+                # Restore chunk position
+                anim = chunk.get_vgroup().animate.move_to(chunk_pos.pop(event.chunk))
+                cost = self.costs.chunks[event.chunk]
+                self.play(
+                    anim,
+                    *self.animate_costs(
+                        transferred=cost.transfer_bytes / 2,
+                        redundant=cost.redundant_flops,
+                    ),
+                    run_time=self.get_download_time(event.chunk),
                 )
-                halo_data_anim = left_chunk.animate_highlight_entry(x, y_left)
-
-                self.play(set_entry_anim, halo_data_anim, run_time=0.2)
-                self.play(left_chunk.animate_reset_entry_fill(x, y_left), run_time=0.2)
-
-        self.play(right_chunk.get_vgroup().animate.move_to(right_pos))
 
-    def construct(self):
-        initial_entries = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-        ]
-        cell_size = 0.5
-
-        grid = Grid(initial_entries, cell_size, None, 0)
-
-        mid_col = grid.get_ncols() // 2 + grid.get_ncols() % 2
-        halo_width = 1
-        left_chunk = Grid(
-            [
-                entry
-                for entry in [row[: mid_col + halo_width] for row in grid.get_entries()]
-            ],
-            cell_size,
-            fill=BLUE,
-            opacity=0.2,
+    def run_chunks_pipelined(self, chunks: list[Grid], gpu_rect: Rectangle, events):
+        """
+        Double-buffered schedule with a copy stream and a compute stream: chunk k
+        computes while chunk k + 1 uploads and chunk k - 1 downloads. The whole
+        round is laid out up front and played as one set of concurrent tracks.
+        """
+        self.next_phase(
+            "pipeline", self.run_chunks_pipelined, **self.phase_inputs(chunks)
         )
-        right_chunk = Grid(
-            [
-                entry
-                for entry in [row[mid_col - halo_width :] for row in grid.get_entries()]
-            ],
-            cell_size,
-            fill=GREEN,
-            opacity=0.2,
+        computes = {}
+        for event in events:
+            if isinstance(event, Compute):
+                computes.setdefault(event.chunk, []).append(event)
+        order = [event.chunk for event in events if isinstance(event, Upload)]
+        home = [chunk.get_vgroup().get_center() for chunk in chunks]
+        slots = self.get_gpu_slots(gpu_rect)
+
+        schedule = AnimationScheduler()
+        # Times at which each stream and each GPU buffer become free
+        copy_free = compute_free = 0
+        slot_free = [0] * len(slots)
+        compute_end = {}
+
+        def upload(n):
+            nonlocal copy_free, compute_free
+            k = order[n]
+            slot = n % len(slots)
+            vgroup = chunks[k].get_vgroup()
+            start = max(copy_free, slot_free[slot])
+            run_time = self.get_upload_time(k)
+            schedule.add(
+                MoveTo(vgroup, slots[slot]),
+                *self.animate_costs(
+                    transferred=self.costs.chunks[k].transfer_bytes / 2
+                ),
+                run_time=run_time,
+                at=start,
+            )
+            copy_free = start + run_time
+
+            compute = self.compute_schedule(chunks[k], computes.get(k, []))
+            start = max(copy_free, compute_free)
+            if len(compute):
+                schedule.add(compute.build(), run_time=compute.get_duration(), at=start)
+            compute_free = compute_end[k] = start + compute.get_duration()
+
+        def download(n):
+            nonlocal copy_free
+            k = order[n]
+            start = max(copy_free, compute_end[k])
+            run_time = self.get_download_time(k)
+            cost = self.costs.chunks[k]
+            schedule.add(
+                MoveTo(chunks[k].get_vgroup(), home[k]),
+                *self.animate_costs(
+                    transferred=cost.transfer_bytes / 2,
+                    redundant=cost.redundant_flops,
+                ),
+                run_time=run_time,
+                at=start,
+            )
+            copy_free = slot_free[n % len(slots)] = start + run_time
+
+        upload(0)
+        for n in range(1, len(order)):
+            upload(n)
+            download(n - 1)
+        download(len(order) - 1)
+        schedule.play(self)
+
+    def spread_chunks(self, chunks: list[Grid], buff=DEFAULT_MOBJECT_TO_MOBJECT_BUFFER):
+        """
+        Centers that lay the chunks out by their block in the chunk layout,
+        with their halos side by side instead of overlapping
+        """
+        blocks = [chunk.block for chunk in self.engine.chunks]
+        widths, heights = {}, {}
+        for chunk, (r, c) in zip(chunks, blocks):
+            widths[c] = max(widths.get(c, 0), chunk.get_vgroup().width)
+            heights[r] = max(heights.get(r, 0), chunk.get_vgroup().height)
+        origin = chunks[0].get_vgroup().get_corner(UL)
+        centers = []
+        for chunk, (r, c) in zip(chunks, blocks):
+            x = sum(widths[k] + buff for k in range(c))
+            y = sum(heights[k] + buff for k in range(r))
+            width, height = chunk.get_vgroup().width, chunk.get_vgroup().height
+            centers.append(origin + (x + width / 2) * RIGHT + (y + height / 2) * DOWN)
+        return centers
+
+    def exchange_halos(self, chunks: list[Grid], events):
+        self.next_phase(
+            "exchange_halos", self.exchange_halos, **self.phase_inputs(chunks)
         )
-
-        grid.get_vgroup().to_edge(LEFT)
-
-        left_chunk.get_vgroup().align_to(grid.get_vgroup().get_left(), LEFT)
-        right_chunk.get_vgroup().align_to(grid.get_vgroup().get_right(), RIGHT)
-
-        cpu_label = Text("CPU")
-        cpu_label.next_to(grid.get_vgroup(), UP)
-
-        self.play(FadeIn(grid.get_vgroup()), FadeIn(cpu_label))
-
-        gpu_rect, gpu_label = self.create_gpu_rect(
-            grid.get_entries(), cell_size, halo_width
+        positions = [chunk.get_vgroup().get_center() for chunk in chunks]
+        centers = self.spread_chunks(chunks)
+        self.play(
+            *[
+                chunk.get_vgroup().animate.move_to(center)
+                for chunk, center in zip(chunks, centers)
+            ]
         )
-        self.play(Create(gpu_rect), Write(gpu_label))
-
-        self.play(FadeIn(left_chunk.get_vgroup()))
-        self.play(FadeIn(right_chunk.get_vgroup()))
-        self.play(FadeOut(grid.get_vgroup()))
-
-        self.run_chunks(left_chunk, right_chunk, gpu_rect)
-        self.exchange_halos(left_chunk, right_chunk)
-
-        self.run_chunks(left_chunk, right_chunk, gpu_rect)
-        self.exchange_halos(left_chunk, right_chunk)
-
-        self.run_chunks(left_chunk, right_chunk, gpu_rect)
-        self.exchange_halos(left_chunk, right_chunk)
-
-        self.run_chunks(left_chunk, right_chunk, gpu_rect)
-        self.exchange_halos(left_chunk, right_chunk)
 
-        self.wait()
-
-
-class Chunking5pBlocking(Scene):
-    def create_gpu_rect(self, entries, cell_size, halo_width):
-        n_cols = len(entries[0])
-        mid_col = n_cols // 2 + n_cols % 2
-
-        padding_x = 0.1
-        padding_y = 0.08
-        gpu_rect = Rectangle(
-            width=(1 + padding_x) * cell_size * (mid_col + halo_width),
-            height=(1 + padding_y) * cell_size * len(entries),
+        # Every neighbour pair exchanges at once
+        copies = []
+        sources = {}
+        for event in events:
+            if not isinstance(event, HaloCopy):
+                continue
+            dst = chunks[event.dst]
+            copies += dst.animate_set_entries(
+                event.dst_rows.tolist(), event.dst_cols.tolist(), event.values.tolist()
+            )
+            sources.setdefault(event.src, set()).update(
+                zip(event.src_rows.tolist(), event.src_cols.tolist())
+            )
+        highlights, resets = [], []
+        for src, cells in sources.items():
+            rows, cols = zip(*sorted(cells))
+            highlights += chunks[src].animate_highlight_entries(rows, cols)
+            resets += chunks[src].animate_reset_entries_fill(rows, cols)
+
+        schedule = AnimationScheduler()
+        schedule.add(
+            *copies,
+            *highlights,
+            *self.animate_costs(halo=self.costs.halo_bytes),
+            run_time=self.measured_run_time("halo", self.halo_time),
+        )
+        schedule.add(*resets, run_time=self.sub_step(0.4))
+        schedule.play(self)
+
+        self.play(
+            *[
+                chunk.get_vgroup().animate.move_to(position)
+                for chunk, position in zip(chunks, positions)
+            ]
         )
-        gpu_rect.to_edge(RIGHT, buff=2)
-
-        # GPU label
-        gpu_label = Text("GPU", font_size=36)
-        gpu_label.next_to(gpu_rect, UP, buff=0.2)  # position above the rectangle
-
-        return gpu_rect, gpu_label
-
-    def run_chunks_temporal_blocking(
-        self,
-        left_chunk: Grid,
-        right_chunk: Grid,
-        gpu_rect: Rectangle,
-        temporal_blocking,
-    ):
-        # Save chunk position
-        left_pos = left_chunk.get_vgroup().get_center()
-        # Move left chunk to gpu
-        anim = left_chunk.get_vgroup().animate.move_to(gpu_rect.get_center())
-        self.play(anim, run_time=1)
-
-        for t_blk in range(temporal_blocking):
-            x_m = 1
-            x_M = left_chunk.get_nrows() - 2
-            y_m = 1
-            y_M = left_chunk.get_ncols() - 2 - t_blk
-            anims = []
-            for x in range(x_m, x_M + 1):
-                for y in range(y_m, y_M + 1):
-                    set_entry_anim = left_chunk.animate_set_entry(
-                        x, y, left_chunk.get_entries()[x][y] + 1
-                    )
-                    if x * left_chunk.get_ncols() + y < 5 + left_chunk.get_ncols():
-                        highlight_anim = left_chunk.animate_highlight_neighbors(x, y)
-                        self.play(highlight_anim, set_entry_anim, run_time=0.2)
-                        anim = left_chunk.animate_reset_fill()
-                        self.play(anim, run_time=0.2)
-                        self.play(set_entry_anim, run_time=0.2)
-                    else:
-                        anims.append(set_entry_anim)
-            self.play(*anims, run_time=1)
-        # Return chunks position
-        self.play(left_chunk.get_vgroup().animate.move_to(left_pos), run_time=1)
-
-        # Save chunks position
-        right_pos = right_chunk.get_vgroup().get_center()
-        # Move chunk to gpu
-        anim = right_chunk.get_vgroup().animate.move_to(gpu_rect.get_center())
-        self.play(anim, run_time=1)
-
-        for t_blk in range(temporal_blocking):
-            x_m = 1
-            x_M = right_chunk.get_nrows() - 2
-            y_m = 1 + t_blk
-            y_M = right_chunk.get_ncols() - 2
-            anims = []
-            for x in range(x_m, x_M + 1):
-                for y in range(y_m, y_M + 1):
-                    set_entry_anim = right_chunk.animate_set_entry(
-                        x, y, right_chunk.get_entries()[x][y] + 1
-                    )
-                    if x * right_chunk.get_ncols() + y < 5 + right_chunk.get_ncols():
-                        highlight_anim = right_chunk.animate_highlight_neighbors(x, y)
-                        self.play(highlight_anim, set_entry_anim, run_time=0.2)
-                        anim = right_chunk.animate_reset_fill()
-                        self.play(anim, run_time=0.2)
-                        self.play(set_entry_anim, run_time=0.2)
-                    else:
-                        anims.append(set_entry_anim)
-            self.play(*anims, run_time=1)
-        # Restore chunks position
-        self.play(right_chunk.get_vgroup().animate.move_to(right_pos), run_time=1)
-
-    def exchange_halos(self, left_chunk: Grid, right_chunk: Grid, temporal_blocking):
-        right_pos = right_chunk.get_vgroup().get_center()
-        self.play(right_chunk.get_vgroup().animate.next_to(left_chunk.get_vgroup()))
-
-        x_m = 0
-        x_M = left_chunk.get_nrows() - 1
-        y_m = left_chunk.get_ncols() - temporal_blocking
-        y_M = left_chunk.get_ncols() - 1
-        for x in range(x_m, x_M + 1):
-            for y in range(y_m, y_M + 1):
-                y_right = y - 2
-                set_entry_anim = left_chunk.animate_set_entry(
-                    x, y, right_chunk.get_entries()[x][y_right]
-                )
-                halo_data_anim = right_chunk.animate_highlight_entry(x, y_right)
-
-                self.play(set_entry_anim, halo_data_anim, run_time=0.2)
-                self.play(
-                    right_chunk.animate_reset_entry_fill(x, y_right), run_time=0.2
-                )
-
-        x_m = 0
-        x_M = left_chunk.get_nrows() - 1
-        y_m = 0
-        y_M = temporal_blocking - 1
-        for x in range(x_m, x_M + 1):
-            for y in range(y_m, y_M + 1):
-                y_left = y + 2
-                set_entry_anim = right_chunk.animate_set_entry(
-                    x, y, left_chunk.get_entries()[x][y_left]
-                )
-                halo_data_anim = left_chunk.animate_highlight_entry(x, y_left)
-
-                self.play(set_entry_anim, halo_data_anim, run_time=0.2)
-                self.play(left_chunk.animate_reset_entry_fill(x, y_left), run_time=0.2)
 
-        self.play(right_chunk.get_vgroup().animate.move_to(right_pos))
+    def gather_entries(self):
+        """
+        Domain values as the chunks show them, each cell from its owning chunk
+        """
+        entries = np.array(self.grid.get_entries())
+        for chunk, chunk_grid in zip(self.engine.chunks, self.chunks):
+            owned = np.asarray(chunk_grid.get_entries())[chunk.local_owned_slices]
+            entries[chunk.owned_slices] = owned
+        return entries
 
     def construct(self):
-        initial_entries = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-        ]
-        cell_size = 0.5
-
-        grid = Grid(initial_entries, cell_size, None, 0)
-
-        mid_col = grid.get_ncols() // 2 + grid.get_ncols() % 2
-        temporal_blocking = 2
-        temporal_blocking_halo = temporal_blocking - 1
-        halo_width = 1
-        left_chunk = Grid(
-            [
-                entry
-                for entry in [
-                    row[: mid_col + halo_width + temporal_blocking_halo]
-                    for row in grid.get_entries()
-                ]
-            ],
-            cell_size,
-            fill=BLUE,
-            opacity=0.2,
+        initial_entries = self.get_initial_entries()
+        self.timings = self.load_timings()
+        cell_size = 4 / max(8, *np.shape(initial_entries))
+
+        # The simulation runs up front; the animation only replays its trace
+        engine = self.engine = StencilEngine(
+            initial_entries,
+            layout=self.layout,
+            halo_width=self.halo_width,
+            temporal_blocking=self.temporal_blocking,
+            stencil=self.stencil,
         )
-        right_chunk = Grid(
-            [
-                entry
-                for entry in [
-                    row[mid_col - halo_width - temporal_blocking_halo :]
-                    for row in grid.get_entries()
-                ]
-            ],
-            cell_size,
-            fill=GREEN,
-            opacity=0.2,
+        rounds = [engine.run_round() for _ in range(self.rounds)]
+        if self.warm_text:
+            self.warm_texts(initial_entries, rounds)
+
+        self.cost_model = CostModel.for_stencil(
+            engine.initial.shape,
+            self.stencil,
+            layout=self.layout,
+            halo_width=engine.halo_width,
+            bandwidth=self.bandwidth,
+            flop_rate=self.flop_rate,
+            overlap=self.pipelined,
         )
+        self.costs = self.cost_model.estimate(self.temporal_blocking)
 
+        grid = self.grid = self.grid_class(initial_entries, cell_size, None, 0)
         grid.get_vgroup().to_edge(LEFT)
 
-        left_chunk.get_vgroup().align_to(grid.get_vgroup().get_left(), LEFT)
-        right_chunk.get_vgroup().align_to(grid.get_vgroup().get_right(), RIGHT)
+        # Chunks are views over the grid's entries and cells, not copies
+        chunks = self.chunks = [
+            grid.view(chunk, fill=color, opacity=0.2)
+            for chunk, color in zip(engine.chunks, cycle(self.chunk_colors))
+        ]
 
         cpu_label = Text("CPU")
         cpu_label.next_to(grid.get_vgroup(), UP)
+        chunk_shape = np.max([chunk.shape for chunk in engine.chunks], axis=0)
+        gpu_rect, gpu_label = create_gpu_rect(chunk_shape, cell_size, self.gpu_buffers)
+        cost_panel = self.create_cost_panel() if self.show_costs else None
+
+        # A render that was interrupted goes on after its last finished round
+        state = self.resume_checkpoint()
+        if state is None:
+            self.play_intro(cpu_label, gpu_rect, gpu_label, cost_panel)
+            first_round = 0
+        else:
+            labels = [cpu_label, gpu_rect, gpu_label]
+            if cost_panel is not None:
+                labels.append(cost_panel)
+            self.add(*labels, *[chunk.get_vgroup() for chunk in chunks])
+            self.set_scene_state(state)
+            first_round = state["round"] + 1
+
+        for round_ in range(first_round, self.rounds):
+            self.round = round_
+            self.run_chunks(chunks, gpu_rect, rounds[round_])
+            self.exchange_halos(chunks, rounds[round_])
+            self.save_checkpoint(self.get_scene_state())
+
+        self.next_section("outro")
+        self.wait()
 
-        self.play(FadeIn(grid.get_vgroup()), FadeIn(cpu_label))
-
-        gpu_rect, gpu_label = self.create_gpu_rect(
-            grid.get_entries(), cell_size, halo_width + temporal_blocking_halo
-        )
-        self.play(Create(gpu_rect), Write(gpu_label))
-
-        self.play(FadeIn(left_chunk.get_vgroup()))
-        self.play(FadeIn(right_chunk.get_vgroup()))
-        self.play(FadeOut(grid.get_vgroup()))
 
-        self.run_chunks_temporal_blocking(
-            left_chunk, right_chunk, gpu_rect, temporal_blocking
-        )
-        self.exchange_halos(left_chunk, right_chunk, temporal_blocking)
+def build_scenes(specs):
+    """
+    A ChunkingScene subclass for every scene spec (see spec.load_specs)
+    """
+    grid_classes = {"Grid": Grid, "ArrayGrid": ArrayGrid, "lod_grid": lod_grid}
+    scenes = {}
+    for name, attrs in specs.items():
+        attrs = dict(attrs)
+        if "grid_class" in attrs:
+            attrs["grid_class"] = grid_classes[attrs["grid_class"]]
+        scenes[name] = type(name, (ChunkingScene,), attrs)
+    return scenes
 
-        self.run_chunks_temporal_blocking(
-            left_chunk, right_chunk, gpu_rect, temporal_blocking
-        )
-        self.exchange_halos(left_chunk, right_chunk, temporal_blocking)
 
-        self.wait()
+# Module globals, so manim finds them like hand-written scenes
+globals().update(build_scenes(load_specs()))
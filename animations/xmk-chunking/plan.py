@@ -0,0 +1,158 @@
+"""
+Plans scenes without rendering them: construct() runs against a renderer
+that skips every frame, and the plan lists the play() calls.
+
+    python plan.py                                 # every scene
+    python plan.py main.py:Chunking5pBlocking -v   # one scene, every play
+    python plan.py --json plan.json
+
+For every scene it reports the play() calls, the video duration, the peak
+mobject count and the final grid values. Scenes with a StencilEngine are
+also checked against the reference stencil, and the exit status is 1 when
+one of them disagrees.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+from manim import tempconfig
+from manim.renderer.cairo_renderer import CairoRenderer
+
+from common import HERE, select_scenes
+from profiling import _count_animations, load_scene
+
+
+@dataclass
+class PlannedPlay:
+    index: int
+    section: str
+    start: float
+    run_time: float
+    animations: int
+    kinds: list
+    mobjects: int
+
+
+class PlanningRenderer(CairoRenderer):
+    """
+    Renderer that plays every animation to its end state without drawing or
+    writing a single frame, and records each play()
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(skip_animations=True, **kwargs)
+        self.plays = []
+        self.peak_mobjects = 0
+
+    def play(self, scene, *args, **kwargs):
+        start = self.time
+        super().play(scene, *args, **kwargs)
+        mobjects = len(scene.get_mobject_family_members())
+        self.peak_mobjects = max(self.peak_mobjects, mobjects)
+        sections = self.file_writer.sections
+        self.plays.append(
+            PlannedPlay(
+                len(self.plays),
+                sections[-1].name if sections else "",
+                start,
+                self.time - start,
+                sum(_count_animations(anim) for anim in scene.animations),
+                sorted({type(anim).__name__ for anim in scene.animations}),
+                mobjects,
+            )
+        )
+
+    def update_frame(self, *args, **kwargs):
+        pass
+
+    def save_static_frame_data(self, *args, **kwargs):
+        pass
+
+    def add_frame(self, *args, **kwargs):
+        pass
+
+
+def plan_scene(scene_class):
+    overrides = {
+        "dry_run": True,
+        "disable_caching": True,
+        "progress_bar": "none",
+        "verbosity": "WARNING",
+    }
+    with tempfile.TemporaryDirectory(prefix="xmk-plan-") as media_dir:
+        overrides["media_dir"] = media_dir
+        with tempconfig(overrides):
+            renderer = PlanningRenderer()
+            scene = scene_class(renderer=renderer)
+            start = time.perf_counter()
+            scene.render()
+            wall_time = time.perf_counter() - start
+
+    result = {
+        "scene": scene_class.__name__,
+        "plays": [asdict(play) for play in renderer.plays],
+        "duration": renderer.time,
+        "peak_mobjects": renderer.peak_mobjects,
+        "wall_time": wall_time,
+        "entries": None,
+        "matches_reference": None,
+    }
+    # Only the chunking scenes keep their grid and engine around
+    if hasattr(scene, "gather_entries"):
+        entries = scene.gather_entries()
+        result["entries"] = entries.tolist()
+        engine = scene.engine
+        result["matches_reference"] = bool(
+            engine.matches_reference() and np.allclose(entries, engine.gather())
+        )
+    return result
+
+
+def print_plan(plan, verbose):
+    print(
+        f"{plan['scene']}: {len(plan['plays'])} plays, {plan['duration']:.1f}s of "
+        f"video, peak {plan['peak_mobjects']} mobjects, planned in "
+        f"{plan['wall_time']:.2f}s"
+    )
+    if verbose:
+        for play in plan["plays"]:
+            print(
+                f"  {play['index']:>4} {play['start']:>7.2f}s "
+                f"+{play['run_time']:<5.2f} {play['section']:<18} "
+                f"{play['animations']:>4} anims  {', '.join(play['kinds'])}"
+            )
+    if plan["entries"] is not None:
+        print("  final entries:")
+        for row in plan["entries"]:
+            print("   ", " ".join(f"{value:g}" for value in row))
+    if plan["matches_reference"] is False:
+        print("  final entries do not match the reference stencil")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenes", nargs="*", help="file.py or file.py:Scene")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list plays")
+    parser.add_argument("--json", type=Path, help="write the plans to this file")
+    args = parser.parse_args(argv)
+
+    plans = []
+    for file, scene, _ in select_scenes(args.scenes):
+        plan = plan_scene(load_scene(HERE / file, scene))
+        print_plan(plan, args.verbose)
+        plans.append(plan)
+
+    if args.json:
+        args.json.write_text(json.dumps(plans, indent=2))
+    if any(plan["matches_reference"] is False for plan in plans):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Named render profiles, from quick drafts to release renders.
+
+    XMK_RENDER_PROFILE=draft manim main.py Chunking5p
+    python render.py --profile final
+
+A profile sets the resolution and frame rate, the font size cell numbers
+are shaped at by Pango (smaller is coarser and cheaper, the glyphs are
+scaled to the same size on screen) and a cache directory of its own for
+text, phases and sweeps. Draft renders also collapse the highlight and reset
+sub-steps of the chunking scenes to single frames. Without a profile,
+manim.cfg and the manim command line decide as usual.
+"""
+
+import os
+from dataclasses import dataclass
+
+from common import HERE, PROFILE_ENV
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    pixel_width: int
+    pixel_height: int
+    frame_rate: float
+    text_font_size: float
+    collapse_steps: bool = False
+
+    @property
+    def cache_dir(self):
+        return HERE / "media" / "profiles" / self.name
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        Profile("draft", 426, 240, 5, 12, collapse_steps=True),
+        Profile("review", 854, 480, 15, 24),
+        Profile("final", 1920, 1080, 30, 48),
+    )
+}
+
+
+def get_profile(name=None):
+    """
+    Profile by name, or the one XMK_RENDER_PROFILE names, or None
+    """
+    name = name or os.environ.get(PROFILE_ENV)
+    if not name:
+        return None
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile {name!r}, pick one of {', '.join(PROFILES)}")
+    return PROFILES[name]
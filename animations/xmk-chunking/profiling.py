@@ -0,0 +1,209 @@
+"""
+Profiles a scene's play() calls and writes a Chrome trace.
+
+    python profiling.py main.py Chunking5p -o trace.json
+
+Open the trace in chrome://tracing, Perfetto or speedscope. Every play() is
+split into the time the scene spent building it (Text creation, .animate
+targets, ...) and the time manim spent playing it, with the frame
+rasterization and encoding parts of the latter in its args.
+"""
+
+import argparse
+import functools
+import importlib.util
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from manim import Wait, config
+from manim.animation.animation import prepare_animation
+
+from common import TRACE_ENV
+
+
+def _count_animations(anim):
+    children = getattr(anim, "animations", None)
+    if children is None:
+        return 1
+    return sum(_count_animations(child) for child in children)
+
+
+class ProfiledSceneMixin:
+    """
+    Opt-in instrumentation: records every play() (and wait(), which plays a
+    Wait) with the phase it was called from, the number of animations and
+    mobjects, build and play time and frames written. The trace is written
+    to profile_output, or to the path in XMK_PROFILE, when the scene ends.
+    Phases are the methods in profile_phases that the scene has.
+    """
+
+    profile_phases = (
+        "construct",
+        "play_intro",
+        "run_chunks",
+        "exchange_halos",
+        # ch1.Chunking
+        "split_grid_into_chunks",
+        "update_chunk",
+    )
+    profile_output = None
+
+    def setup(self):
+        super().setup()
+        self._trace = []
+        self._phase_stack = []
+        self._origin = time.perf_counter()
+        self._last_play_end = self._origin
+        self._frame_costs = defaultdict(float)
+        for name in self.profile_phases:
+            method = getattr(self, name, None)
+            if method is not None:
+                setattr(self, name, self._profile_phase(name, method))
+        renderer = self.renderer
+        renderer.update_frame = self._profile_cost("rasterize", renderer.update_frame)
+        file_writer = renderer.file_writer
+        file_writer.write_frame = self._profile_cost("encode", file_writer.write_frame)
+
+    def _ts(self, t):
+        return (t - self._origin) * 1e6
+
+    def _event(self, name, cat, start, end, **args):
+        self._trace.append(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": self._ts(start),
+                "dur": (end - start) * 1e6,
+                "pid": 0,
+                "tid": 0,
+                "args": args,
+            }
+        )
+
+    def _profile_phase(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            self._phase_stack.append(name)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._event(name, "phase", start, time.perf_counter())
+                self._phase_stack.pop()
+
+        return wrapper
+
+    def _profile_cost(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._frame_costs[name] += time.perf_counter() - start
+
+        return wrapper
+
+    def play(self, *args, **kwargs):
+        start = time.perf_counter()
+        phase = self._phase_stack[-1] if self._phase_stack else None
+        anims = [prepare_animation(anim) for anim in args]
+        self._event("build", "build", self._last_play_end, start, phase=phase)
+
+        costs = dict(self._frame_costs)
+        rendered = self.renderer.time
+        super().play(*anims, **kwargs)
+        end = time.perf_counter()
+
+        is_wait = all(isinstance(anim, Wait) for anim in anims)
+        self._event(
+            "wait" if is_wait else "play",
+            "play",
+            start,
+            end,
+            phase=phase,
+            animations=sum(_count_animations(anim) for anim in anims),
+            mobjects=sum(len(anim.mobject.get_family()) for anim in anims),
+            frames=round((self.renderer.time - rendered) * config.frame_rate),
+            rasterize_s=self._frame_costs["rasterize"] - costs.get("rasterize", 0),
+            encode_s=self._frame_costs["encode"] - costs.get("encode", 0),
+        )
+        self._last_play_end = end
+
+    def tear_down(self):
+        super().tear_down()
+        output = self.profile_output or os.environ.get(TRACE_ENV)
+        if output:
+            write_trace(self._trace, output)
+
+
+def write_trace(events, output):
+    trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+    Path(output).write_text(json.dumps(trace))
+
+
+def summarize(events):
+    """
+    Seconds per phase spent building plays, playing them, rasterizing and encoding
+    """
+    summary = defaultdict(lambda: defaultdict(float))
+    for event in events:
+        if event["cat"] == "phase":
+            continue
+        phase = summary[event["args"]["phase"]]
+        phase[event["cat"]] += event["dur"] / 1e6
+        if event["cat"] == "play":
+            phase["plays"] += 1
+            phase["frames"] += event["args"]["frames"]
+            phase["rasterize"] += event["args"]["rasterize_s"]
+            phase["encode"] += event["args"]["encode_s"]
+    return summary
+
+
+def load_scene(file, name):
+    path = Path(file).resolve()
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered like an import, so inspect can find the scene's source file
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument("scene")
+    parser.add_argument("-o", "--output", type=Path, default=Path("trace.json"))
+    args = parser.parse_args(argv)
+
+    scene_class = load_scene(args.file, args.scene)
+    profiled = type(
+        scene_class.__name__,
+        (ProfiledSceneMixin, scene_class),
+        {"profile_output": args.output},
+    )
+    scene = profiled()
+    scene.render()
+
+    print(f"{'phase':<16}{'plays':>7}{'frames':>8}", end="")
+    print("".join(f"{col:>11}" for col in ("build", "play", "rasterize", "encode")))
+    for phase, costs in summarize(scene._trace).items():
+        print(f"{str(phase):<16}{costs['plays']:>7.0f}{costs['frames']:>8.0f}", end="")
+        print(
+            "".join(
+                f"{costs[col]:>10.2f}s"
+                for col in ("build", "play", "rasterize", "encode")
+            )
+        )
+    print(f"Trace written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Renders the chunking scenes in parallel and stitches the results.
+
+    python render.py                      # every scene, all cores
+    python render.py main.py:Chunking5p -j 8
+    python render.py -- -ql               # extra arguments go to manim
+    python render.py --stream             # one encoder pass per scene
+    python render.py --profile draft      # see profiles.py
+
+Scenes that split their phases with next_section (see sections.py) are
+rendered by several manim processes at once, each one rendering every n-th
+section, and the section videos are concatenated back in order. With
+--stream every scene is one process writing a single movie, with its
+sections recorded as chapters instead (see stream.py).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from common import (
+    HERE,
+    PROFILE_ENV,
+    SECTIONS_ENV,
+    STREAM_ENV,
+    TEXT_JOBS_ENV,
+    TEXT_STORE,
+    TEXT_STORE_ENV,
+    select_scenes,
+    text_jobs,
+)
+from profiles import PROFILES
+
+
+class RenderJob:
+    def __init__(
+        self,
+        file,
+        scene,
+        worker,
+        n_workers,
+        media_dir,
+        manim_args,
+        stream=False,
+        profile=None,
+        text_jobs="1",
+    ):
+        self.file = file
+        self.scene = scene
+        self.worker = worker
+        self.n_workers = n_workers
+        self.media_dir = Path(media_dir)
+        self.manim_args = manim_args
+        self.stream = stream
+        self.profile = profile
+        self.text_jobs = text_jobs
+
+    def command(self):
+        cmd = [sys.executable, "-m", "manim", "render", "--media_dir"]
+        cmd += [str(self.media_dir), *self.manim_args]
+        if self.n_workers > 1:
+            cmd.append("--save_sections")
+        return cmd + [self.file, self.scene]
+
+    def env(self):
+        env = dict(os.environ)
+        if self.n_workers > 1:
+            env[SECTIONS_ENV] = f"{self.worker}/{self.n_workers}"
+        if self.stream:
+            env[STREAM_ENV] = "1"
+        if self.profile:
+            env[PROFILE_ENV] = self.profile
+        # Every worker has a media directory of its own, but they all shape the
+        # same text, see glyphs.warm_text_cache
+        env[TEXT_STORE_ENV] = str(TEXT_STORE)
+        env[TEXT_JOBS_ENV] = self.text_jobs
+        return env
+
+    def run(self):
+        result = subprocess.run(
+            self.command(),
+            cwd=HERE,
+            env=self.env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"{self.file}:{self.scene} worker {self.worker} failed\n{result.stdout}"
+            )
+        return self
+
+    def videos_dir(self):
+        return self.media_dir / "videos" / Path(self.file).stem
+
+    def get_movie(self):
+        return next(self.videos_dir().glob(f"*/{self.scene}.mp4"))
+
+    def get_sections(self):
+        """
+        Returns (section index, video path) for the sections this worker rendered
+        """
+        sections = []
+        for index_file in self.videos_dir().glob(f"*/sections/{self.scene}.json"):
+            for section in json.loads(index_file.read_text()):
+                video = index_file.parent / section["video"]
+                # Section videos are named <scene>_<index>_<name>
+                index = int(section["video"][len(self.scene) + 1 :].split("_")[0])
+                sections.append((index, video))
+        return sections
+
+
+def concat_videos(videos, output):
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as listing:
+        for video in videos:
+            listing.write(f"file '{Path(video).resolve()}'\n")
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0"]
+            + ["-i", listing.name, "-c", "copy", str(output)],
+            check=True,
+        )
+    finally:
+        os.unlink(listing.name)
+
+
+def render(scenes, jobs, output_dir, manim_args, work_dir, stream=False, profile=None):
+    splits = max(1, jobs // len(scenes))
+    render_jobs = []
+    for file, scene, sectioned in scenes:
+        n_workers = splits if sectioned and not stream else 1
+        for worker in range(n_workers):
+            media_dir = Path(work_dir) / f"{Path(file).stem}_{scene}_{worker}"
+            render_jobs.append(
+                RenderJob(
+                    file,
+                    scene,
+                    worker,
+                    n_workers,
+                    media_dir,
+                    manim_args,
+                    stream,
+                    profile,
+                    text_jobs(jobs),
+                )
+            )
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        # Each job is its own manim process, threads only wait on them
+        finished = list(pool.map(RenderJob.run, render_jobs))
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = []
+    for file, scene, _ in scenes:
+        scene_jobs = [j for j in finished if j.file == file and j.scene == scene]
+        output = output_dir / f"{Path(file).stem}_{scene}.mp4"
+        if scene_jobs[0].n_workers == 1:
+            movie = scene_jobs[0].get_movie()
+            shutil.copyfile(movie, output)
+            # Chapters of a streamed render
+            for suffix in (".segments.json", ".chapters.txt"):
+                if movie.with_suffix(suffix).exists():
+                    shutil.copyfile(
+                        movie.with_suffix(suffix), output.with_suffix(suffix)
+                    )
+        else:
+            sections = sorted(s for job in scene_jobs for s in job.get_sections())
+            concat_videos([video for _, video in sections], output)
+        outputs.append(output)
+    return outputs
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Everything after "--" is passed through to manim
+    manim_args = []
+    if "--" in argv:
+        manim_args = argv[argv.index("--") + 1 :]
+        argv = argv[: argv.index("--")]
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenes", nargs="*", help="file.py or file.py:Scene")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output-dir", type=Path, default=HERE / "renders")
+    parser.add_argument(
+        "--stream", action="store_true", help="no partial movie files, see stream.py"
+    )
+    parser.add_argument("--profile", choices=list(PROFILES), help="render profile")
+    args = parser.parse_args(argv)
+
+    scenes = select_scenes(args.scenes)
+    with tempfile.TemporaryDirectory(prefix="xmk-render-") as work_dir:
+        outputs = render(
+            scenes,
+            args.jobs,
+            args.output_dir,
+            manim_args,
+            work_dir,
+            args.stream,
+            args.profile,
+        )
+        for output in outputs:
+            print(output)
+
+
+if __name__ == "__main__":
+    main()
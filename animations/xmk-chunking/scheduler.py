@@ -0,0 +1,101 @@
+import numpy as np
+from manim import Animation, AnimationGroup, Succession, Wait
+from manim.animation.animation import prepare_animation
+
+
+class MoveTo(Animation):
+    """
+    Moves a mobject's center to point. Unlike mobject.animate.move_to nothing is
+    copied when it is built, so it can be scheduled ahead of animations that
+    change the mobject before it starts.
+    """
+
+    def __init__(self, mobject, point, **kwargs):
+        super().__init__(mobject, **kwargs)
+        self.point = np.array(point)
+
+    def create_starting_mobject(self):
+        return self.mobject
+
+    def begin(self):
+        self.start = self.mobject.get_center()
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alpha = self.rate_func(alpha)
+        self.mobject.move_to(self.start + (self.point - self.start) * alpha)
+
+
+class AnimationScheduler:
+    """
+    Collects animations at time offsets and plays them as a single play() call.
+    Each add() is one step that would otherwise have been its own
+    self.play(*anims, run_time=run_time).
+    """
+
+    def __init__(self):
+        self._steps = []
+        self.time = 0
+
+    def add(self, *anims, run_time=1, at=None):
+        """
+        Schedules anims to start at `at` (default: when the previous step ends)
+        """
+        start = self.time if at is None else at
+        # Build now: .animate targets are stored on the mobject and get replaced
+        # by the next .animate call on the same mobject
+        anims = [prepare_animation(anim) for anim in anims]
+        if anims:
+            self._steps.append((start, run_time, anims))
+        self.time = max(self.time, start + run_time)
+        return start
+
+    def pause(self, run_time):
+        self.time += run_time
+
+    def get_duration(self):
+        return self.time
+
+    def __len__(self):
+        return len(self._steps)
+
+    def _is_sequential(self):
+        end = 0
+        for start, run_time, _ in self._steps:
+            if start < end:
+                return False
+            end = start + run_time
+        return True
+
+    def build(self):
+        steps = sorted(self._steps, key=lambda step: step[0])
+        if self._is_sequential():
+            track = []
+            end = 0
+            for start, run_time, anims in steps:
+                if start > end:
+                    track.append(Wait(run_time=start - end))
+                track.append(AnimationGroup(*anims, run_time=run_time))
+                end = start + run_time
+            if self.time > end:
+                track.append(Wait(run_time=self.time - end))
+            return Succession(*track)
+
+        # Overlapping steps each get their own track, delayed by a Wait. A
+        # Succession finishes its animations when they end, not when the play
+        # does, so a later step on the same mobject starts from their result.
+        tracks = []
+        for start, run_time, anims in steps:
+            delay = [Wait(run_time=start)] if start else []
+            tracks.append(Succession(*delay, AnimationGroup(*anims, run_time=run_time)))
+        if self.time > max(start + run_time for start, run_time, _ in steps):
+            tracks.append(Wait(run_time=self.time))
+        return AnimationGroup(*tracks)
+
+    def play(self, scene):
+        if self._steps:
+            scene.play(self.build())
+        elif self.time:
+            scene.wait(self.time)
+        self._steps = []
+        self.time = 0
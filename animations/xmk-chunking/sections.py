@@ -0,0 +1,326 @@
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+from manim import DefaultSectionType, RendererType, Scene, config
+from manim.renderer.cairo_renderer import CairoRenderer
+
+from common import PHASE_CACHE_ENV, SECTIONS_ENV, hash_sources
+from glyphs import glyph_cache, set_text_store
+from profiles import get_profile
+from stream import StreamingFileWriter, streaming
+
+PHASE_CACHE_DIR = Path(__file__).resolve().parent / "media" / "phase_cache"
+
+
+def _parse_worker(value):
+    if not value:
+        return None
+    k, n = value.split("/")
+    return int(k), int(n)
+
+
+def _jsonable(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
+
+def render_config():
+    return {
+        "pixel_width": config.pixel_width,
+        "pixel_height": config.pixel_height,
+        "frame_rate": config.frame_rate,
+        "background_color": str(config.background_color),
+        "background_opacity": config.background_opacity,
+        "movie_file_extension": config.movie_file_extension,
+        "text_font_size": glyph_cache.font_size,
+    }
+
+
+def source_hash(scene):
+    """
+    Hash of the Python files next to the scene's module
+    """
+    return hash_sources(Path(inspect.getfile(type(scene))).parent)
+
+
+def apply_profile(profile):
+    """
+    Points manim's config at a render profile, see profiles.py
+    """
+    config.pixel_width = profile.pixel_width
+    config.pixel_height = profile.pixel_height
+    config.frame_rate = profile.frame_rate
+    set_text_store(profile.cache_dir / "texts")
+    glyph_cache.set_font_size(profile.text_font_size)
+
+
+def use_profile(scene):
+    """
+    Applies the profile XMK_RENDER_PROFILE names, if any, and keeps it as
+    scene.profile. Scenes call it before their renderer is built.
+    """
+    scene.profile = get_profile()
+    if scene.profile is not None:
+        apply_profile(scene.profile)
+
+
+class RenderProfileMixin:
+    """
+    Gives a plain Scene the render profile, like SectionedScene has
+    """
+
+    def __init__(self, *args, **kwargs):
+        use_profile(self)
+        super().__init__(*args, **kwargs)
+
+
+def phase_key(scene, name, code, inputs):
+    """
+    Stable hash of everything a phase's video depends on: the scene's sources
+    and settings, the state the phase starts from and the render config
+    """
+    payload = {
+        "scene": type(scene).__qualname__,
+        "name": name,
+        "code": code.__qualname__,
+        "source": source_hash(scene),
+        "scene_inputs": scene.checkpoint_inputs(),
+        "inputs": inputs,
+        "config": render_config(),
+    }
+    data = json.dumps(payload, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(data.encode()).hexdigest()[:24]
+
+
+def _store_phase_files(files, path):
+    # Kept as manim wrote them: one file combined from them has another time
+    # base than the scene's own, and a movie concatenated from both does not
+    # mux
+    partial = path.with_name(f"{path.name}.partial")
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir(parents=True)
+    for number, file in enumerate(files):
+        shutil.copyfile(file, partial / f"{number:04}{Path(file).suffix}")
+    shutil.rmtree(path, ignore_errors=True)
+    partial.rename(path)
+
+
+def _phase_files(path):
+    return [str(file) for file in sorted(path.iterdir())]
+
+
+class SectionedScene(Scene):
+    """
+    Scene whose phases are split with next_section. When rendered by render.py,
+    each worker process only renders its share of the sections and skips the
+    animations of the others.
+
+    Sections opened with next_phase are also cached on disk by a hash of their
+    inputs, and phases whose inputs did not change are reused instead of rendered.
+    Each phase is stored as soon as it ends, and save_checkpoint records how far
+    the scene got, so an interrupted render resumes after its last checkpoint
+    (see resume_checkpoint).
+
+    With XMK_STREAM set the whole scene goes through one encoder instead (see
+    stream.py), and phases are neither cached, split nor checkpointed.
+
+    XMK_RENDER_PROFILE picks a render profile (see profiles.py), which the scene
+    applies before its renderer is built.
+    """
+
+    _worker = None
+    _streaming = False
+    checkpoints = True
+
+    def __init__(self, renderer=None, **kwargs):
+        use_profile(self)
+        if renderer is None and config.renderer == RendererType.CAIRO and streaming():
+            self._streaming = True
+            # No play is written on its own, so there is nothing to cache
+            config.disable_caching = True
+            renderer = CairoRenderer(
+                file_writer_class=StreamingFileWriter,
+                camera_class=kwargs.get("camera_class"),
+                skip_animations=kwargs.get("skip_animations", False),
+            )
+        super().__init__(renderer=renderer, **kwargs)
+
+    def setup(self):
+        super().setup()
+        if not self._streaming:
+            self._worker = _parse_worker(os.environ.get(SECTIONS_ENV))
+        self._phases = {}
+        self._stored = set()
+        # Plays before the first phase go to a section of their own, which
+        # only one worker renders
+        self.next_section("setup")
+
+    def _owns_section(self, index):
+        if self._worker is None:
+            return True
+        k, n = self._worker
+        return index % n == k
+
+    def next_section(
+        self,
+        name: str = "unnamed",
+        section_type: str = DefaultSectionType.NORMAL,
+        skip_animations: bool = False,
+    ):
+        sections = self.renderer.file_writer.sections
+        last = len(sections) - 1
+        if sections and sections[-1].is_empty():
+            # manim drops a section nothing was played in, and the new one
+            # takes its index
+            self._phases.pop(last, None)
+            index = last
+        else:
+            # The section before this one is complete
+            if last in self._phases:
+                self._store_phase(last)
+            index = last + 1
+        skip_animations = skip_animations or not self._owns_section(index)
+        super().next_section(name, section_type, skip_animations)
+
+    def get_cache_dir(self):
+        cache_dir = PHASE_CACHE_DIR
+        if self.profile is not None:
+            cache_dir = self.profile.cache_dir / "phase_cache"
+        return Path(os.environ.get(PHASE_CACHE_ENV, cache_dir))
+
+    def next_phase(self, name: str, code, **inputs):
+        """
+        Starts a cacheable section. code is the function that animates the phase,
+        inputs is the state it starts from (entries, chunk geometry, ...).
+        """
+        if self._streaming:
+            self.next_section(name)
+            return
+        cache_dir = self.get_cache_dir()
+        key = phase_key(self, name, code, inputs)
+        path = cache_dir / key
+        hit = config.write_to_movie and path.is_dir()
+        self.next_section(name, skip_animations=hit)
+        self._phases[len(self.renderer.file_writer.sections) - 1] = (path, hit)
+
+    def _store_phase(self, index):
+        path, hit = self._phases[index]
+        if hit or index in self._stored or not config.write_to_movie:
+            return
+        if not self._owns_section(index):
+            return
+        self._stored.add(index)
+        section = self.renderer.file_writer.sections[index]
+        files = section.get_clean_partial_movie_files()
+        if files:
+            _store_phase_files(files, path)
+
+    def _checkpointing(self):
+        return self.checkpoints and config.write_to_movie and not self._streaming
+
+    def checkpoint_inputs(self):
+        """
+        What the scene's animation depends on besides its source and the state
+        a phase starts from: every setting that changes how it renders
+        """
+        return {}
+
+    def get_checkpoint_path(self):
+        payload = {
+            "scene": type(self).__qualname__,
+            "source": source_hash(self),
+            "inputs": self.checkpoint_inputs(),
+            "config": render_config(),
+        }
+        data = json.dumps(payload, sort_keys=True, default=_jsonable)
+        key = hashlib.sha256(data.encode()).hexdigest()[:24]
+        name = f"{type(self).__qualname__}-{key}.json"
+        return self.get_cache_dir() / "checkpoints" / name
+
+    def save_checkpoint(self, state):
+        """
+        Ends the current phase and records state, plain data, together with the
+        phase videos so far. Nothing is saved unless every section up to here
+        is a stored phase or has no video.
+        """
+        if not self._checkpointing():
+            return
+        phases = []
+        for index, section in enumerate(self.renderer.file_writer.sections):
+            if index not in self._phases:
+                if section.get_clean_partial_movie_files():
+                    return
+                continue
+            self._store_phase(index)
+            path, _ = self._phases[index]
+            if not path.exists():
+                return
+            phases.append([section.name, str(path)])
+        checkpoint = self.get_checkpoint_path()
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        partial = checkpoint.with_name(f"{checkpoint.stem}.partial.json")
+        partial.write_text(
+            json.dumps({"phases": phases, "state": state}, default=_jsonable)
+        )
+        partial.replace(checkpoint)
+
+    def resume_checkpoint(self):
+        """
+        State saved by the last save_checkpoint of this scene, or None. The
+        phases before it are reopened as cached sections, so the scene only
+        has to restore the state and go on from there.
+        """
+        if not self._checkpointing():
+            return None
+        checkpoint = self.get_checkpoint_path()
+        if not checkpoint.exists():
+            return None
+        data = json.loads(checkpoint.read_text())
+        if not all(Path(video).exists() for _, video in data["phases"]):
+            return None
+        sections = self.renderer.file_writer.sections
+        for name, video in data["phases"]:
+            self.next_section(name, skip_animations=True)
+            # The videos stand in for the phase's plays, so manim keeps the
+            # section, and tear_down puts them into the movie
+            sections[-1].partial_movie_files.extend(_phase_files(Path(video)))
+            self._phases[len(sections) - 1] = (Path(video), True)
+        return data["state"]
+
+    def tear_down(self):
+        super().tear_down()
+        if not config.write_to_movie:
+            return
+        file_writer = self.renderer.file_writer
+        for index, (path, hit) in self._phases.items():
+            if not self._owns_section(index):
+                continue
+            if not hit:
+                self._store_phase(index)
+                continue
+            # The cached videos stand in for the section's skipped plays
+            section = file_writer.sections[index]
+            section.partial_movie_files = _phase_files(path)
+            if config.save_sections and section.video is None:
+                section.video = (
+                    f"{file_writer.output_name}_{index:04}_{section.name}"
+                    f"{config.movie_file_extension}"
+                )
+        # Section videos are combined from the sections' files, but the movie
+        # from the writer's own list, which has None for every skipped play
+        file_writer.partial_movie_files = [
+            file
+            for section in file_writer.sections
+            for file in section.partial_movie_files
+        ]
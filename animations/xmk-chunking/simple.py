@@ -1,24 +1,11 @@
-from manim import *
+from manim import BLUE, LEFT, RIGHT, TEAL, Create, FadeIn, Rectangle, Scene, VGroup
 
+from glyphs import ValueFade
+from grid import Grid
+from sections import RenderProfileMixin
 
-class Chunking(Scene):
-    def create_grid(self, entries, cell_size):
-        n_rows = len(entries)
-        n_cols = len(entries[0])
-        # Create full grid of squares with text
-        grid = VGroup()
-        for i in range(n_rows):   
-            row = VGroup()
-            for j in range(n_cols):
-                square = Square(side_length=cell_size, color=BLUE)
-                number = Text(entries[i][j]).scale(0.5)
-                number.move_to(square.get_center())
-                row.add(VGroup(square, number))
-            row.arrange(RIGHT, buff=0)
-            grid.add(row)
-        grid.arrange(DOWN, buff=0)
-        return grid
 
+class Chunking(RenderProfileMixin, Scene):
     def construct(self):
         entries = [
             ["0", "0", "0", "0", "0", "0", "0", "0"],
@@ -32,7 +19,7 @@ class Chunking(Scene):
         ]
 
         cell_size = 0.5
-        grid = self.create_grid(entries, cell_size)
+        grid = Grid(entries, cell_size, None, 0).get_vgroup()
         grid.to_edge(LEFT)
         self.play(FadeIn(grid))
 
@@ -80,12 +67,7 @@ class Chunking(Scene):
             for j, cell in enumerate(row):
                 square, number = cell
                 new_value = str(int(entries[i][j]) + 1)  # simple increment
-                self.play(
-                    Transform(
-                        number, Text(new_value).scale(0.5).move_to(square.get_center())
-                    ),
-                    run_time=0.1,
-                )
+                self.play(ValueFade(number, new_value), run_time=0.1)
 
         # Shift left half back to left side
         self.play(left_half.animate.move_to(original_position))
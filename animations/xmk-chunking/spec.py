@@ -0,0 +1,184 @@
+"""
+Declarative specs of the chunking scenes in main.py, read from scenes.toml
+next to manim.cfg (or a JSON file with the same tables).
+
+    python spec.py                 # list the scenes and their settings
+    python spec.py variants.json
+
+Every table is one scene: main.py turns it into a subclass of ChunkingScene
+with the table's keys as class attributes. Loading checks the keys and their
+types without importing manim, so render.py can list the scenes cheaply.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+from stencil import STENCILS
+
+HERE = Path(__file__).resolve().parent
+SPEC_FILE = HERE / "scenes.toml"
+
+_NUMBER = (int, float)
+# Keys a scene table may set and the types their values must have
+KEYS = {
+    "grid_size": int,
+    "entries": list,
+    "layout": list,
+    "stencil": str,
+    "halo_width": int,
+    "temporal_blocking": int,
+    "rounds": int,
+    "pipelined": bool,
+    "grid_class": str,
+    "upload_time": _NUMBER,
+    "download_time": _NUMBER,
+    "compute_time": _NUMBER,
+    "halo_time": _NUMBER,
+    "timings_file": str,
+    "timings_duration": _NUMBER,
+    "timings_exponent": _NUMBER,
+    "show_costs": bool,
+    "bandwidth": _NUMBER,
+    "flop_rate": _NUMBER,
+}
+GRID_CLASSES = ("Grid", "ArrayGrid", "lod_grid")
+# Run times included, manim refuses to play an animation of no length
+POSITIVE = (
+    "grid_size",
+    "halo_width",
+    "temporal_blocking",
+    "rounds",
+    "upload_time",
+    "download_time",
+    "compute_time",
+    "halo_time",
+    "timings_duration",
+    "bandwidth",
+    "flop_rate",
+)
+# ChunkingScene's defaults for the keys the checks across keys need
+DEFAULTS = {"grid_size": 8, "layout": [1, 2], "stencil": "5-point"}
+
+
+class SpecError(ValueError):
+    pass
+
+
+def _check(name, key, value):
+    expected = KEYS.get(key)
+    if expected is None:
+        raise SpecError(f"[{name}]: unknown key {key!r}")
+    # bool is an int, but true is never meant as a grid size
+    if isinstance(value, bool) != (expected is bool) or not isinstance(value, expected):
+        raise SpecError(f"[{name}]: {key} = {value!r} has the wrong type")
+    if key == "layout" and (
+        len(value) != 2 or not all(isinstance(n, int) and n > 0 for n in value)
+    ):
+        raise SpecError(f"[{name}]: layout must be [row chunks, column chunks]")
+    if key == "entries" and (
+        not value or len({len(row) for row in value}) != 1 or not value[0]
+    ):
+        raise SpecError(f"[{name}]: entries must be rows of equal length")
+    if key == "stencil" and value not in STENCILS:
+        raise SpecError(f"[{name}]: stencil must be one of {', '.join(STENCILS)}")
+    if key == "grid_class" and value not in GRID_CLASSES:
+        raise SpecError(
+            f"[{name}]: grid_class must be one of {', '.join(GRID_CLASSES)}"
+        )
+    if key in POSITIVE and value <= 0:
+        raise SpecError(f"[{name}]: {key} must be positive")
+
+
+def _check_domain(name, table):
+    """
+    Checks that the halo covers the stencil and every chunk owns a cell
+    """
+    settings = {**DEFAULTS, **table}
+    radius = STENCILS[settings["stencil"]].radius
+    if settings.get("halo_width", radius) < radius:
+        raise SpecError(
+            f"[{name}]: halo_width must be at least the stencil radius ({radius})"
+        )
+    if "entries" in settings:
+        shape = (len(settings["entries"]), len(settings["entries"][0]))
+    else:
+        shape = (settings["grid_size"], settings["grid_size"])
+    if any(chunks > cells for chunks, cells in zip(settings["layout"], shape)):
+        raise SpecError(
+            f"[{name}]: layout {settings['layout']} has more chunks than the "
+            f"{shape[0]}x{shape[1]} domain has rows or columns"
+        )
+
+
+def read_specs(path=SPEC_FILE):
+    """
+    Scene tables of a spec file by scene name, in file order, checked but
+    not converted
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        tables = json.loads(path.read_text())
+    else:
+        tables = tomllib.loads(path.read_text())
+    for name, table in tables.items():
+        try:
+            check_table(name, table)
+        except SpecError as e:
+            raise SpecError(f"{path}: {e}") from None
+    return tables
+
+
+def check_table(name, table):
+    if not name.isidentifier():
+        raise SpecError(f"scene name {name!r} is not an identifier")
+    if not isinstance(table, dict):
+        raise SpecError(f"{name} is not a table")
+    for key, value in table.items():
+        _check(name, key, value)
+    _check_domain(name, table)
+
+
+def scene_attributes(table, root=HERE):
+    """
+    Class attributes for a scene table: stencils by name become Stencil
+    objects, layouts tuples, timings files are relative to root
+    """
+    attrs = dict(table)
+    if "stencil" in attrs:
+        attrs["stencil"] = STENCILS[attrs["stencil"]]
+    if "layout" in attrs:
+        attrs["layout"] = tuple(attrs["layout"])
+    if "timings_file" in attrs:
+        attrs["timings_file"] = str(Path(root) / attrs["timings_file"])
+    return attrs
+
+
+def load_specs(path=SPEC_FILE):
+    """
+    Class attributes for every scene of a spec file, see scene_attributes
+    """
+    path = Path(path)
+    return {
+        name: scene_attributes(table, path.parent)
+        for name, table in read_specs(path).items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("spec", nargs="?", type=Path, default=SPEC_FILE)
+    args = parser.parse_args(argv)
+
+    for name, table in read_specs(args.spec).items():
+        settings = ", ".join(f"{key}={value}" for key, value in table.items())
+        print(f"{name}: {settings or 'defaults'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+class Stencil:
+    """
+    Stencil shape: the (row, column) offsets a cell's update reads, the cell
+    itself included. Neighbour tables are built once per grid shape, so looking
+    up a cell's neighbours is a single index into a NumPy array.
+    """
+
+    def __init__(self, name, offsets):
+        self.name = name
+        self.offsets = np.array(offsets, dtype=int).reshape(-1, 2)
+        self.radius = int(np.abs(self.offsets).max())
+        self.neighbor_offsets = self.offsets[np.any(self.offsets != 0, axis=1)]
+        self._tables = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __repr__(self):
+        return f"Stencil({self.name!r})"
+
+    def neighbor_table(self, shape):
+        """
+        Flat indices of every cell's neighbours in a grid of the given shape,
+        one row per cell and -1 where a neighbour falls outside the grid
+        """
+        shape = tuple(shape)
+        table = self._tables.get(shape)
+        if table is None:
+            rows, cols = np.indices(shape).reshape(2, -1, 1)
+            rows = rows + self.neighbor_offsets[:, 0]
+            cols = cols + self.neighbor_offsets[:, 1]
+            inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+            table = np.where(inside, rows * shape[1] + cols, -1)
+            self._tables[shape] = table
+        return table
+
+    def neighbors(self, i, j, shape):
+        """
+        (rows, cols) of the neighbours of cell (i, j) that lie inside the grid
+        """
+        flat = self.neighbor_table(shape)[i * shape[1] + j]
+        return np.divmod(flat[flat >= 0], shape[1])
+
+    def apply(self, u, weights=None):
+        """
+        Weighted sum over the stencil for every cell at least radius cells away
+        from the edge of u
+        """
+        if weights is None:
+            weights = np.ones(len(self))
+        r = self.radius
+        n, m = u.shape
+        total = 0
+        for (di, dj), weight in zip(self.offsets, weights):
+            total = total + weight * u[r + di : n - r + di, r + dj : m - r + dj]
+        return total
+
+
+def _star(radius):
+    offsets = [(0, 0)]
+    for k in range(1, radius + 1):
+        offsets += [(-k, 0), (k, 0), (0, -k), (0, k)]
+    return offsets
+
+
+FIVE_POINT = Stencil("5-point", _star(1))
+# 3x3 box
+NINE_POINT = Stencil("9-point", [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)])
+# Every cell within Manhattan distance 2, as in the biharmonic operator
+THIRTEEN_POINT = Stencil(
+    "13-point",
+    [(di, dj) for di in range(-2, 3) for dj in range(-2, 3) if abs(di) + abs(dj) <= 2],
+)
+STENCILS = {s.name: s for s in (FIVE_POINT, NINE_POINT, THIRTEEN_POINT)}
+
+
+def increment(u, stencil):
+    """
+    Kernel used by the scenes: every updated cell goes up by one
+    """
+    r = stencil.radius
+    return u[r:-r, r:-r] + 1
+
+
+def jacobi(u, stencil):
+    """
+    Jacobi average over the stencil
+    """
+    return stencil.apply(u) / len(stencil)
+
+
+@dataclass
+class Chunk:
+    index: int
+    # Position of the chunk in the (row, column) chunk layout
+    block: tuple
+    # Global (row, column) ranges held by the chunk, halos included
+    start: tuple
+    stop: tuple
+    # Global (row, column) ranges the chunk is responsible for
+    owned_start: tuple
+    owned_stop: tuple
+
+    @property
+    def shape(self):
+        return (self.stop[0] - self.start[0], self.stop[1] - self.start[1])
+
+    @property
+    def slices(self):
+        return tuple(slice(lo, hi) for lo, hi in zip(self.start, self.stop))
+
+    @property
+    def owned_slices(self):
+        return tuple(slice(*r) for r in zip(self.owned_start, self.owned_stop))
+
+    @property
+    def local_owned_slices(self):
+        return tuple(
+            slice(lo - s, hi - s)
+            for lo, hi, s in zip(self.owned_start, self.owned_stop, self.start)
+        )
+
+
+@dataclass
+class Upload:
+    chunk: int
+
+
+@dataclass
+class Download:
+    chunk: int
+
+
+@dataclass
+class Compute:
+    chunk: int
+    step: int
+    # Chunk-local coordinates of the written cells, row-major
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+
+
+@dataclass
+class HaloCopy:
+    src: int
+    dst: int
+    src_rows: np.ndarray
+    src_cols: np.ndarray
+    dst_rows: np.ndarray
+    dst_cols: np.ndarray
+    values: np.ndarray
+
+
+def _split_axis(n, n_chunks, halo):
+    ranges = []
+    for k, owned in enumerate(np.array_split(np.arange(n), n_chunks)):
+        owned_start, owned_stop = int(owned[0]), int(owned[-1]) + 1
+        start = max(0, owned_start - halo) if k > 0 else 0
+        stop = min(n, owned_stop + halo) if k < n_chunks - 1 else n
+        ranges.append((start, stop, owned_start, owned_stop))
+    return ranges
+
+
+def decompose(shape, layout, halo):
+    """
+    Splits a domain into layout = (row chunks, column chunks) chunks, each
+    holding a halo of the given width towards its neighbours
+    """
+    if isinstance(layout, int):
+        layout = (1, layout)
+    row_ranges = _split_axis(shape[0], layout[0], halo)
+    col_ranges = _split_axis(shape[1], layout[1], halo)
+    chunks = []
+    for r, rows in enumerate(row_ranges):
+        for c, cols in enumerate(col_ranges):
+            chunks.append(
+                Chunk(
+                    len(chunks),
+                    (r, c),
+                    (rows[0], cols[0]),
+                    (rows[1], cols[1]),
+                    (rows[2], cols[2]),
+                    (rows[3], cols[3]),
+                )
+            )
+    return chunks
+
+
+def _cells(rows, cols):
+    r, c = np.meshgrid(rows, cols, indexing="ij")
+    return r.ravel(), c.ravel()
+
+
+def reference(entries, steps, kernel=increment, stencil=FIVE_POINT):
+    """
+    Runs the stencil on the whole domain, the result chunked runs must match.
+    Cells within the stencil radius of the edge are a fixed boundary.
+    """
+    u = np.array(entries)
+    r = stencil.radius
+    for _ in range(steps):
+        u[r:-r, r:-r] = kernel(u, stencil)
+    return u
+
+
+class StencilEngine:
+    """
+    Vectorized stencil over a domain split into a layout of chunks.
+    Each round uploads every chunk, runs temporal_blocking steps on it, downloads
+    it and then exchanges halos. Everything written is appended to trace so the
+    scenes only have to replay it.
+
+    halo_width defaults to the stencil radius and can not be smaller.
+    """
+
+    def __init__(
+        self,
+        entries,
+        layout=(1, 2),
+        halo_width=None,
+        temporal_blocking=1,
+        kernel=increment,
+        stencil=FIVE_POINT,
+    ):
+        self.initial = np.array(entries)
+        self.kernel = kernel
+        self.stencil = stencil
+        self.radius = stencil.radius
+        if halo_width is None:
+            halo_width = self.radius
+        if halo_width < self.radius:
+            raise ValueError(
+                f"halo_width {halo_width} is smaller than the radius of the "
+                f"{stencil.name} stencil ({self.radius})"
+            )
+        self.halo_width = halo_width
+        self.temporal_blocking = temporal_blocking
+        self.halo = halo_width + (temporal_blocking - 1) * self.radius
+        self.chunks = decompose(self.initial.shape, layout, self.halo)
+        self.data = [self.initial[c.slices].copy() for c in self.chunks]
+        self.steps = 0
+        self.trace = []
+
+    def _compute_range(self, chunk, t, axis):
+        # Step t must also produce the halo cells that later steps of the block read
+        extent = (self.temporal_blocking - 1 - t) * self.radius
+        lo = max(self.radius, chunk.owned_start[axis] - extent)
+        hi = min(
+            self.initial.shape[axis] - self.radius, chunk.owned_stop[axis] + extent
+        )
+        return lo - chunk.start[axis], hi - chunk.start[axis]
+
+    def compute_chunk(self, chunk):
+        u = self.data[chunk.index]
+        events = []
+        for t in range(self.temporal_blocking):
+            r0, r1 = self._compute_range(chunk, t, 0)
+            c0, c1 = self._compute_range(chunk, t, 1)
+            r = self.radius
+            new = self.kernel(u[r0 - r : r1 + r, c0 - r : c1 + r], self.stencil)
+            u[r0:r1, c0:c1] = new
+            rows, cols = _cells(np.arange(r0, r1), np.arange(c0, c1))
+            events.append(Compute(chunk.index, self.steps + t, rows, cols, new.ravel()))
+        return events
+
+    def exchange_halos(self):
+        """
+        Copies every owned region that overlaps a neighbour's halo, for all
+        neighbour pairs (diagonal ones included)
+        """
+        events = []
+        for dst in self.chunks:
+            for src in self.chunks:
+                if src is dst:
+                    continue
+                lo = np.maximum(src.owned_start, dst.start)
+                hi = np.minimum(src.owned_stop, dst.stop)
+                if np.any(hi <= lo):
+                    continue
+                rows, cols = _cells(np.arange(lo[0], hi[0]), np.arange(lo[1], hi[1]))
+                src_rows, src_cols = rows - src.start[0], cols - src.start[1]
+                dst_rows, dst_cols = rows - dst.start[0], cols - dst.start[1]
+                values = self.data[src.index][src_rows, src_cols]
+                self.data[dst.index][dst_rows, dst_cols] = values
+                events.append(
+                    HaloCopy(
+                        src.index,
+                        dst.index,
+                        src_rows,
+                        src_cols,
+                        dst_rows,
+                        dst_cols,
+                        values,
+                    )
+                )
+        return events
+
+    def run_round(self):
+        events = []
+        for chunk in self.chunks:
+            events.append(Upload(chunk.index))
+            events.extend(self.compute_chunk(chunk))
+            events.append(Download(chunk.index))
+        self.steps += self.temporal_blocking
+        events.extend(self.exchange_halos())
+        self.trace.extend(events)
+        return events
+
+    def run(self, rounds):
+        for _ in range(rounds):
+            self.run_round()
+        return self.trace
+
+    def gather(self):
+        u = np.empty_like(self.initial)
+        for chunk, data in zip(self.chunks, self.data):
+            u[chunk.owned_slices] = data[chunk.local_owned_slices]
+        return u
+
+    def matches_reference(self):
+        expected = reference(self.initial, self.steps, self.kernel, self.stencil)
+        return np.allclose(self.gather(), expected)
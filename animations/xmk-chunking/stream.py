@@ -0,0 +1,164 @@
+"""
+Single-pass movie writer for scenes with many short plays.
+
+manim writes every play() to its own partial movie file and concatenates
+them when the scene ends. StreamingFileWriter keeps one encoder open for the
+whole scene instead: frames go straight into the final movie, and where each
+play and section starts is written next to it as
+
+- <movie>.segments.json: plays and sections with their frame and time ranges
+- <movie>.chapters.txt: the sections as ffmpeg chapters, to add them with
+  ffmpeg -i movie.mp4 -i movie.chapters.txt -map_metadata 1 -c copy out.mp4
+
+Set XMK_STREAM=1 (or pass --stream to render.py) to render SectionedScenes
+this way. Sound, GIF output and section videos are not supported.
+"""
+
+import json
+import os
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+
+import av
+from manim import config, logger
+from manim.scene.scene_file_writer import SceneFileWriter, to_av_frame_rate
+from manim.utils.file_ops import is_gif_format, write_to_movie
+
+from common import STREAM_ENV
+
+
+def streaming():
+    return (
+        os.environ.get(STREAM_ENV, "") not in ("", "0")
+        and write_to_movie()
+        and not is_gif_format()
+    )
+
+
+class StreamingFileWriter(SceneFileWriter):
+    """
+    SceneFileWriter that encodes all plays into one stream, see the module
+    docstring
+    """
+
+    def __init__(self, renderer, scene_name, **kwargs):
+        self.frames = 0
+        self.segments = []
+        self.video_container = None
+        super().__init__(renderer, scene_name, **kwargs)
+
+    def is_already_cached(self, hash_invocation):
+        # Plays are never written on their own, so none can be reused
+        return False
+
+    def get_stream_path(self):
+        path = Path(self.movie_file_path)
+        return path.with_name(f"{path.stem}.partial{path.suffix}")
+
+    def begin_animation(self, allow_write=False, file_path=None):
+        if not (write_to_movie() and allow_write):
+            return
+        if self.video_container is None:
+            self.get_stream_path().parent.mkdir(parents=True, exist_ok=True)
+            self.open_partial_movie_stream(file_path=str(self.get_stream_path()))
+        self.segments.append(
+            {
+                "play": self.renderer.num_plays,
+                "section": self.sections[-1].name,
+                "start_frame": self.frames,
+            }
+        )
+
+    def open_partial_movie_stream(self, file_path=None):
+        # Like SceneFileWriter's, but the container stays open across plays
+        fps = to_av_frame_rate(config.frame_rate)
+        codec, pix_fmt = "libx264", "yuv420p"
+        options = {"an": "1", "crf": "23"}
+        if config.movie_file_extension == ".webm":
+            codec = "libvpx-vp9"
+            options["-auto-alt-ref"] = "1"
+            if config.transparent:
+                pix_fmt = "yuva420p"
+        elif config.transparent:
+            codec, pix_fmt = "qtrle", "argb"
+
+        self.video_container = av.open(file_path, mode="w")
+        stream = self.video_container.add_stream(codec, rate=fps, options=options)
+        stream.pix_fmt = pix_fmt
+        stream.width = config.pixel_width
+        stream.height = config.pixel_height
+        self.video_stream = stream
+
+        self.queue = Queue()
+        self.writer_thread = Thread(target=self.listen_and_write)
+        self.writer_thread.start()
+
+    def write_frame(self, frame_or_renderer, num_frames=1):
+        if write_to_movie():
+            self.frames += num_frames
+        super().write_frame(frame_or_renderer, num_frames)
+
+    def end_animation(self, allow_write=False):
+        if write_to_movie() and allow_write:
+            self.segments[-1]["end_frame"] = self.frames
+
+    def close_partial_movie_stream(self):
+        self.queue.put((-1, None))
+        self.writer_thread.join()
+        for packet in self.video_stream.encode():
+            self.video_container.mux(packet)
+        self.video_container.close()
+        self.video_container = None
+
+    def get_sections(self):
+        """
+        Frame ranges of the sections that have frames, in order
+        """
+        sections = []
+        for segment in self.segments:
+            if sections and sections[-1]["name"] == segment["section"]:
+                sections[-1]["end_frame"] = segment["end_frame"]
+            else:
+                sections.append(
+                    {
+                        "name": segment["section"],
+                        "start_frame": segment["start_frame"],
+                        "end_frame": segment["end_frame"],
+                    }
+                )
+        return sections
+
+    def write_segments(self, movie):
+        fps = config.frame_rate
+        plays, sections = self.segments, self.get_sections()
+        for segment in plays + sections:
+            segment["start"] = segment["start_frame"] / fps
+            segment["end"] = segment["end_frame"] / fps
+        index = {"frame_rate": fps, "sections": sections, "plays": plays}
+        movie.with_suffix(".segments.json").write_text(json.dumps(index, indent=2))
+
+        lines = [";FFMETADATA1"]
+        for section in sections:
+            lines += [
+                "[CHAPTER]",
+                f"TIMEBASE=1/{fps:g}",
+                f"START={section['start_frame']}",
+                f"END={section['end_frame']}",
+                f"title={section['name']}",
+            ]
+        movie.with_suffix(".chapters.txt").write_text("\n".join(lines) + "\n")
+
+    def finish(self):
+        if not write_to_movie():
+            return super().finish()
+        if self.video_container is None:
+            logger.info("No animations are contained in this scene.")
+            return
+        self.close_partial_movie_stream()
+        movie = Path(self.movie_file_path)
+        self.get_stream_path().replace(movie)
+        self.write_segments(movie)
+        self.print_file_ready_message(str(movie))
+        if self.subcaptions:
+            self.write_subcaption_file()
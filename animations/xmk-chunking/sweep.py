@@ -0,0 +1,227 @@
+"""
+Renders variants of the chunking scenes over a grid of parameters.
+
+    python sweep.py Chunking5p --set temporal_blocking 1 2 3 4 --set grid_size 8 16 32
+    python sweep.py Chunking9p --set layout 1x2 2x2 -q l -j 4 -o sweep
+    python sweep.py --set rounds 1 2 --profile draft
+
+Every combination of the --set values is applied on top of the scene's
+table in scenes.toml (see spec.py) and rendered in its own process. Movies
+go into a cache keyed by the parameters, a hash of the scene sources and
+the manim.cfg profile, so variants that were rendered before are not
+rendered again.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from common import (
+    HERE,
+    PROFILE_ENV,
+    TEXT_JOBS_ENV,
+    TEXT_STORE,
+    TEXT_STORE_ENV,
+    hash_sources,
+    parse_layout,
+    text_jobs,
+)
+from profiles import PROFILES, get_profile
+from spec import SPEC_FILE, SpecError, check_table, read_specs
+
+CACHE_DIR = HERE / "media" / "sweep_cache"
+QUALITIES = {
+    "l": "low_quality",
+    "m": "medium_quality",
+    "h": "high_quality",
+    "p": "production_quality",
+    "k": "fourk_quality",
+}
+
+
+def profile(quality, render_profile=None):
+    """
+    What the movie depends on besides the scene: manim.cfg, the -q override and
+    the render profile, which wins over both
+    """
+    cfg = HERE / "manim.cfg"
+    return {
+        "manim.cfg": cfg.read_text() if cfg.exists() else "",
+        "quality": quality,
+        "profile": render_profile,
+    }
+
+
+def variant_key(scene, table, sources, render_profile):
+    payload = {
+        "scene": scene,
+        "params": table,
+        "sources": sources,
+        "profile": render_profile,
+    }
+    # A measured run is an input too, not just its path
+    if "timings_file" in table:
+        path = SPEC_FILE.parent / table["timings_file"]
+        payload["timings"] = hashlib.sha256(path.read_bytes()).hexdigest()
+    data = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:24]
+
+
+def parse_value(key, text):
+    if key == "layout":
+        return list(parse_layout(text))
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Bare strings such as 9-point or lod_grid
+        return text
+
+
+def expand(tables, params):
+    """
+    (scene, table) for every scene and every combination of the params values
+    """
+    keys = list(params)
+    for scene, base in tables.items():
+        for values in itertools.product(*params.values()):
+            table = {**base, **dict(zip(keys, values))}
+            check_table(scene, table)
+            yield scene, table
+
+
+def variant_name(scene, params, table):
+    suffix = "_".join(
+        f"{key}={'x'.join(map(str, value)) if key == 'layout' else value}"
+        for key, value in table.items()
+        if key in params
+    )
+    return f"{scene}_{suffix}" if suffix else scene
+
+
+def render_variant(job):
+    os.chdir(HERE)
+    sys.path.insert(0, str(HERE))
+    if job["profile"]:
+        os.environ[PROFILE_ENV] = job["profile"]
+    os.environ[TEXT_STORE_ENV] = str(TEXT_STORE)
+    os.environ[TEXT_JOBS_ENV] = job["text_jobs"]
+    import main as scenes
+    from manim import tempconfig
+    from spec import scene_attributes
+
+    # A name of its own per variant, so variants never share phase cache entries
+    name = f"{job['scene']}_{job['key'][:8]}"
+    attrs = scene_attributes(job["table"])
+    scene_class = scenes.build_scenes({name: attrs})[name]
+    overrides = {"progress_bar": "none", "verbosity": "WARNING"}
+    if job["quality"]:
+        overrides["quality"] = QUALITIES[job["quality"]]
+    with tempfile.TemporaryDirectory(prefix="xmk-sweep-") as media_dir:
+        overrides["media_dir"] = media_dir
+        with tempconfig(overrides):
+            scene = scene_class()
+            scene.render()
+            movie = Path(scene.renderer.file_writer.movie_file_path)
+            output = Path(job["output"])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            partial = output.with_name(f"{output.stem}.partial{output.suffix}")
+            shutil.copyfile(movie, partial)
+            partial.replace(output)
+    return job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenes", nargs="*", help="tables of scenes.toml (all)")
+    parser.add_argument(
+        "--set",
+        nargs="+",
+        action="append",
+        default=[],
+        metavar=("KEY", "VALUE"),
+        help="a scene attribute and the values to sweep it over",
+    )
+    parser.add_argument("-q", "--quality", choices=list(QUALITIES))
+    parser.add_argument("--profile", choices=list(PROFILES), help="render profile")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--cache-dir", type=Path, help="default: per profile")
+    parser.add_argument("-o", "--output-dir", type=Path, help="copy movies here")
+    parser.add_argument("--force", action="store_true", help="ignore the cache")
+    args = parser.parse_args(argv)
+
+    params = {}
+    for key, *values in args.set:
+        if not values:
+            parser.error(f"--set {key} needs at least one value")
+        params[key] = [parse_value(key, value) for value in values]
+
+    tables = read_specs()
+    unknown = set(args.scenes) - set(tables)
+    if unknown:
+        parser.error(f"unknown scenes: {', '.join(sorted(unknown))}")
+    if args.scenes:
+        tables = {scene: tables[scene] for scene in args.scenes}
+
+    render_profile = get_profile(args.profile)
+    cache_dir = args.cache_dir
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+        if render_profile is not None:
+            cache_dir = render_profile.cache_dir / "sweep_cache"
+    profile_name = render_profile.name if render_profile else None
+
+    sources = hash_sources()
+    key_profile = profile(args.quality, profile_name)
+    all_jobs, jobs = [], []
+    try:
+        variants = list(expand(tables, params))
+    except SpecError as e:
+        parser.error(str(e))
+    for scene, table in variants:
+        key = variant_key(scene, table, sources, key_profile)
+        job = {
+            "scene": scene,
+            "name": variant_name(scene, params, table),
+            "table": table,
+            "key": key,
+            "quality": args.quality,
+            "profile": profile_name,
+            "text_jobs": text_jobs(args.jobs),
+            "output": str(cache_dir.resolve() / f"{key}.mp4"),
+        }
+        all_jobs.append(job)
+        if args.force or not Path(job["output"]).exists():
+            jobs.append(job)
+    print(
+        f"{len(all_jobs)} variants, {len(all_jobs) - len(jobs)} cached",
+        file=sys.stderr,
+    )
+
+    # manim's config is global, so every variant gets a fresh process
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as pool:
+        for job in pool.map(render_variant, jobs):
+            print(f"rendered {job['name']}", file=sys.stderr)
+
+    for job in all_jobs:
+        output = Path(job["output"])
+        if args.output_dir:
+            args.output_dir.mkdir(parents=True, exist_ok=True)
+            output = args.output_dir / f"{job['name']}.mp4"
+            shutil.copyfile(job["output"], output)
+        print(f"{job['name']}\t{output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Checks of the stencil engine the scenes replay, no renderer needed.
+
+    python -m pytest -q test_stencil.py
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from stencil import STENCILS, StencilEngine, decompose, jacobi
+
+LAYOUTS = [(1, 1), (1, 2), (2, 2), (1, 4), (3, 1), (2, 3)]
+
+
+def domain(shape=(12, 12)):
+    return np.arange(np.prod(shape)).reshape(shape)
+
+
+@pytest.mark.parametrize("stencil", STENCILS.values(), ids=str)
+@pytest.mark.parametrize("layout", LAYOUTS, ids=str)
+@pytest.mark.parametrize("extra_halo", [0, 1, 3])
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_matches_reference(stencil, layout, extra_halo, depth):
+    engine = StencilEngine(
+        domain(),
+        layout=layout,
+        halo_width=stencil.radius + extra_halo,
+        temporal_blocking=depth,
+        stencil=stencil,
+    )
+    engine.run(2)
+    assert engine.steps == 2 * depth
+    assert engine.matches_reference()
+
+
+@pytest.mark.parametrize("layout", [(1, 2), (2, 2)], ids=str)
+def test_matches_reference_jacobi(layout):
+    engine = StencilEngine(
+        domain().astype(float), layout=layout, temporal_blocking=2, kernel=jacobi
+    )
+    engine.run(3)
+    assert engine.matches_reference()
+
+
+def test_halo_narrower_than_stencil():
+    with pytest.raises(ValueError):
+        StencilEngine(domain(), halo_width=1, stencil=STENCILS["13-point"])
+
+
+@pytest.mark.parametrize("shape", [(8, 8), (7, 10), (5, 3)], ids=str)
+@pytest.mark.parametrize("layout", [(1, 1), (1, 2), (2, 2), (3, 2)], ids=str)
+@pytest.mark.parametrize("halo", [0, 1, 2, 6])
+def test_decompose_owns_every_cell_once(shape, layout, halo):
+    owners = np.zeros(shape, dtype=int)
+    for chunk in decompose(shape, layout, halo):
+        owners[chunk.owned_slices] += 1
+        held = np.zeros(shape, dtype=bool)
+        held[chunk.slices] = True
+        # The owned cells are inside the held ones, at the same place locally
+        assert held[chunk.owned_slices].all()
+        assert np.array_equal(
+            domain(shape)[chunk.slices][chunk.local_owned_slices],
+            domain(shape)[chunk.owned_slices],
+        )
+    assert (owners == 1).all()
+
+
+def test_decompose_layout_int():
+    assert decompose((4, 6), 3, 1) == decompose((4, 6), (1, 3), 1)
+
+
+def test_decompose_single_chunk_has_no_halo():
+    (chunk,) = decompose((5, 7), (1, 1), 2)
+    assert chunk.start == (0, 0) and chunk.stop == (5, 7)
+    assert chunk.owned_start == (0, 0) and chunk.owned_stop == (5, 7)
+
+
+def test_decompose_uneven_split():
+    chunks = decompose((1, 10), (1, 3), 1)
+    assert [c.owned_stop[1] - c.owned_start[1] for c in chunks] == [4, 3, 3]
+    assert [(c.start[1], c.stop[1]) for c in chunks] == [(0, 5), (3, 8), (6, 10)]
+
+
+def test_decompose_halo_clipped_to_domain():
+    # A halo wider than a neighbour's owned cells reaches past it, never past
+    # the domain
+    chunks = decompose((6, 6), (1, 3), 5)
+    assert [(c.start[1], c.stop[1]) for c in chunks] == [(0, 6), (0, 6), (0, 6)]
+    assert [c.block for c in chunks] == [(0, 0), (0, 1), (0, 2)]
+
+
+def test_decompose_blocks_in_row_major_order():
+    chunks = decompose((4, 4), (2, 2), 1)
+    assert [c.index for c in chunks] == [0, 1, 2, 3]
+    assert [c.block for c in chunks] == list(itertools.product(range(2), range(2)))
@@ -0,0 +1,166 @@
+"""
+Measured timings for the chunking scenes, read from a profiler export.
+
+Two formats are read:
+
+- CSV with the columns kind, chunk, start and duration (or end), in any
+  time unit. kind is upload, compute, halo or download; chunk may be empty
+  for halo copies.
+- Chrome-trace JSON, as written by most profilers: complete ("X") events
+  with ts and dur. The kind comes from args.kind or else from the event
+  name (HtoD/upload, DtoH/download, DtoD/PtoP/halo, anything else with a
+  chunk is a kernel), the chunk from args.chunk.
+
+Rounds are counted from the uploads: a chunk that is uploaded again starts
+the next round. Measured durations are scaled so all of them together last
+`duration` seconds of animation, see MeasuredTimings.
+"""
+
+import csv
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+KINDS = ("upload", "compute", "halo", "download")
+
+_NAME_KINDS = [
+    (("htod", "h2d", "upload"), "upload"),
+    (("dtoh", "d2h", "download"), "download"),
+    (("dtod", "ptop", "peer", "halo"), "halo"),
+]
+
+
+@dataclass
+class Span:
+    kind: str
+    chunk: Optional[int]
+    start: float
+    duration: float
+    round: int = 0
+
+
+def _kind_from_name(name, chunk):
+    key = name.lower().replace(" ", "").replace("_", "")
+    for keywords, kind in _NAME_KINDS:
+        if any(keyword in key for keyword in keywords):
+            return kind
+    return "compute" if chunk is not None else None
+
+
+def _chunk(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def read_csv(path):
+    spans = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            start = float(row["start"])
+            if row.get("duration") not in (None, ""):
+                duration = float(row["duration"])
+            else:
+                duration = float(row["end"]) - start
+            spans.append(Span(row["kind"], _chunk(row.get("chunk")), start, duration))
+    return spans
+
+
+def read_chrome_trace(path):
+    data = json.loads(Path(path).read_text())
+    events = data["traceEvents"] if isinstance(data, dict) else data
+    spans = []
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        args = event.get("args", {})
+        chunk = _chunk(args.get("chunk"))
+        kind = args.get("kind") or _kind_from_name(event.get("name", ""), chunk)
+        if kind in KINDS:
+            spans.append(Span(kind, chunk, float(event["ts"]), float(event["dur"])))
+    return spans
+
+
+def assign_rounds(spans):
+    """
+    Numbers the rounds in start order: a chunk uploaded twice starts a new round
+    """
+    spans = sorted(spans, key=lambda span: span.start)
+    uploaded = set()
+    round_ = 0
+    for span in spans:
+        if span.kind == "upload":
+            if span.chunk in uploaded:
+                round_ += 1
+                uploaded.clear()
+            uploaded.add(span.chunk)
+        span.round = round_
+    return spans
+
+
+class MeasuredTimings:
+    """
+    Run times for the scene's steps, proportional to a measured run.
+
+    Measured durations d are mapped to scale * d ** exponent, where scale makes
+    all of them add up to `duration` seconds. An exponent below 1 compresses
+    long runs so short transfers stay visible next to long kernels; no step
+    is shorter than min_run_time.
+    """
+
+    def __init__(self, spans, duration=30, exponent=1.0, min_run_time=0.1):
+        self.spans = assign_rounds(spans)
+        self.exponent = exponent
+        self.min_run_time = min_run_time
+        self._durations = {
+            key: [d**exponent for d in values]
+            for key, values in self._measure().items()
+        }
+        total = sum(sum(values) for values in self._durations.values())
+        self.scale = duration / total if total else 0
+        payload = json.dumps(
+            [[s.kind, s.chunk, s.start, s.duration] for s in self.spans]
+            + [duration, exponent, min_run_time]
+        )
+        self.digest = hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def _measure(self):
+        durations = {}
+        for span in self.spans:
+            if span.kind == "halo":
+                continue
+            key = (span.kind, span.round, span.chunk)
+            durations.setdefault(key, []).append(span.duration)
+        # Halo copies of a round overlap, so the round takes their envelope
+        halos = {}
+        for span in self.spans:
+            if span.kind == "halo":
+                start, end = halos.get(span.round, (span.start, span.start))
+                halos[span.round] = (
+                    min(start, span.start),
+                    max(end, span.start + span.duration),
+                )
+        for round_, (start, end) in halos.items():
+            durations[("halo", round_, None)] = [end - start]
+        return durations
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        path = Path(path)
+        if path.suffix == ".csv":
+            spans = read_csv(path)
+        else:
+            spans = read_chrome_trace(path)
+        return cls(spans, **kwargs)
+
+    def run_time(self, kind, round, chunk=None, index=0):
+        """
+        Seconds of animation for the index-th measured step of kind for chunk
+        in round, or None when the trace has no such step
+        """
+        durations = self._durations.get((kind, round, chunk))
+        if durations is None or index >= len(durations):
+            return None
+        return max(self.min_run_time, self.scale * durations[index])